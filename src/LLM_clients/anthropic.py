@@ -1,19 +1,25 @@
 import anthropic
 import json
+from LLM_clients import tracing, usage
 
 def call_anthropic_api(api_key, system_prompt, user_prompt, player_id, cost):
-    client = anthropic.Anthropic(api_key=api_key)
+    with tracing.span("client_init", provider="anthropic"):
+        client = anthropic.Anthropic(api_key=api_key)
 
-    response = client.messages.create(
-        model="claude-3-7-sonnet-20250219",
-        max_tokens=1500,
-        temperature=0.7,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_prompt}]
-    )
+    with tracing.span("request", provider="anthropic"):
+        response = client.messages.create(
+            model="claude-3-7-sonnet-20250219",
+            max_tokens=1500,
+            temperature=0.7,
+            # the system prompt is identical across a sweep: mark it as a cacheable prefix
+            system=[{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
+            messages=[{"role": "user", "content": user_prompt}]
+        )
+        usage.from_anthropic(response.usage)
 
-    response_text = response.content[0].text
-    try:
-        return json.loads(response_text)
-    except json.JSONDecodeError:
-        return {"raw_output": response_text}
+    with tracing.span("parse", provider="anthropic"):
+        response_text = response.content[0].text
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            return {"raw_output": response_text}
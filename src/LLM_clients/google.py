@@ -1,39 +1,58 @@
 # llm_clients/google_client.py
 
 import json
+from LLM_clients import tracing, usage
+from LLM_clients.logprobs import call_chat_with_logprobs
 from openai import OpenAI
 
 def call_gemini_api(api_key, system_prompt, user_prompt, player_id, cost):
     """
     Send system + user prompts to Gemini 2.5 Flash via the OpenAI-compatible endpoint,
     """
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-    )
-
-    response = client.chat.completions.create(
-        model="gemini-2.0-flash",
-        temperature=0.7,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user",   "content": user_prompt}
-        ]
-    )
-
-    text = response.choices[0].message.content
-
-    # 1. If text starts with ``` (and maybe "json"), remove the first and last lines
-    if text.lstrip().startswith("```"):
-        lines = text.splitlines()
-        # drop the fence lines
-        lines = lines[1:-1]
-        text = "\n".join(lines)
-
-    # 2. Trim any extra whitespace
-    text = text.strip()
-
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        return {"raw_output": text}
+    with tracing.span("client_init", provider="google"):
+        client = OpenAI(
+            api_key=api_key,
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+        )
+
+    with tracing.span("request", provider="google"):
+        response = client.chat.completions.create(
+            model="gemini-2.0-flash",
+            temperature=0.7,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user",   "content": user_prompt}
+            ]
+        )
+        usage.from_chat(response.usage, "google")
+
+    with tracing.span("parse", provider="google"):
+        text = response.choices[0].message.content
+
+        # 1. If text starts with ``` (and maybe "json"), remove the first and last lines
+        if text.lstrip().startswith("```"):
+            lines = text.splitlines()
+            # drop the fence lines
+            lines = lines[1:-1]
+            text = "\n".join(lines)
+
+        # 2. Trim any extra whitespace
+        text = text.strip()
+
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return {"raw_output": text}
+
+
+def call_gemini_logprob_api(api_key, system_prompt, user_prompt, player_id, cost):
+    """
+    Single greedy call returning the parsed response plus "p_decision" = P(a_i = 1)
+    read from the decision token's log-probabilities.
+    """
+    with tracing.span("client_init", provider="google"):
+        client = OpenAI(
+            api_key=api_key,
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+        )
+    return call_chat_with_logprobs(client, "gemini-2.0-flash", system_prompt, user_prompt, player_id, "google")
@@ -0,0 +1,175 @@
+import os
+import json
+import copy
+import queue
+import threading
+from concurrent.futures import Future
+from LLM_clients import tracing
+
+# ---------------------------------------------------------------------
+# Local CPU inference with a small open-weight model (transformers).
+#
+# The chat-templated text up to the user turn (system prompt included) is
+# identical for every player, cost and repetition of a sweep.  Its KV cache
+# is computed once per distinct prefix and reused; only the user turn and
+# the answer are processed per call.  Calls arriving concurrently (see
+# line_network --concurrency) are gathered into one batched generate().
+#
+# Requires `pip install torch transformers`.  The model is taken from the
+# LOCAL_MODEL environment variable (hub id or local path).
+# ---------------------------------------------------------------------
+
+DEFAULT_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+MAX_NEW_TOKENS = 256
+TEMPERATURE = 0.7
+MAX_BATCH = 8
+BATCH_WINDOW_S = 0.05
+_SENTINEL = "<<USER_PROMPT>>"
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class LocalEngine:
+    def __init__(self, model_name):
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as e:
+            raise ImportError("The local provider needs torch and transformers: pip install torch transformers") from e
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForCausalLM.from_pretrained(model_name)
+        self.model.eval()
+        self.pad_id = self.tokenizer.pad_token_id
+        if self.pad_id is None:
+            self.pad_id = self.tokenizer.eos_token_id
+        self._prefixes = {}  # prefix text -> (prefix ids, KV cache)
+        self._requests = queue.Queue()
+        threading.Thread(target=self._serve, name="local-batcher", daemon=True).start()
+
+    # -----------------------------------------------------------------
+    # Prompt splitting and prefix cache
+    # -----------------------------------------------------------------
+    def split_prompt(self, system_prompt, user_prompt):
+        """Render the chat template and split it into the shared prefix and the per-call suffix."""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": _SENTINEL},
+        ]
+        text = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        prefix, suffix = text.split(_SENTINEL, 1)
+        return prefix, user_prompt + suffix
+
+    def prefix_cache(self, prefix):
+        """Return (ids, KV cache) for prefix, running the model on it only the first time."""
+        if prefix not in self._prefixes:
+            ids = self.tokenizer(prefix, return_tensors="pt", add_special_tokens=False).input_ids
+            with self.torch.no_grad():
+                out = self.model(input_ids=ids, use_cache=True)
+            self._prefixes[prefix] = (ids, out.past_key_values)
+        return self._prefixes[prefix]
+
+    @staticmethod
+    def _expand(cache, batch):
+        cache = copy.deepcopy(cache)
+        if hasattr(cache, "batch_repeat_interleave"):
+            cache.batch_repeat_interleave(batch)
+            return cache
+        return tuple((k.repeat_interleave(batch, 0), v.repeat_interleave(batch, 0)) for k, v in cache)
+
+    # -----------------------------------------------------------------
+    # Batched generation
+    # -----------------------------------------------------------------
+    def generate(self, prefix, suffixes, do_sample=True):
+        """Generate one answer per suffix, all continuing the same cached prefix."""
+        torch = self.torch
+        prefix_ids, cache = self.prefix_cache(prefix)
+        encoded = [self.tokenizer(s, add_special_tokens=False).input_ids for s in suffixes]
+        width = max(len(ids) for ids in encoded)
+        batch = len(encoded)
+
+        # [prefix][left padding][suffix]: padding sits after the cached prefix and is masked out,
+        # positions are derived from the attention mask so each row stays contiguous.
+        input_ids = torch.full((batch, prefix_ids.shape[1] + width), self.pad_id, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        input_ids[:, :prefix_ids.shape[1]] = prefix_ids
+        attention_mask[:, :prefix_ids.shape[1]] = 1
+        for row, ids in enumerate(encoded):
+            input_ids[row, input_ids.shape[1] - len(ids):] = torch.tensor(ids)
+            attention_mask[row, input_ids.shape[1] - len(ids):] = 1
+
+        with torch.no_grad():
+            out = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                past_key_values=self._expand(cache, batch),
+                max_new_tokens=MAX_NEW_TOKENS,
+                do_sample=do_sample,
+                temperature=TEMPERATURE if do_sample else None,
+                top_p=None,
+                top_k=None,
+                pad_token_id=self.pad_id,
+            )
+        return self.tokenizer.batch_decode(out[:, input_ids.shape[1]:], skip_special_tokens=True)
+
+    def submit(self, system_prompt, user_prompt):
+        """Queue one request for the batcher and return a Future of the generated text."""
+        fut = Future()
+        self._requests.put((*self.split_prompt(system_prompt, user_prompt), fut))
+        return fut
+
+    def _serve(self):
+        while True:
+            pending = [self._requests.get()]
+            try:
+                while len(pending) < MAX_BATCH:
+                    pending.append(self._requests.get(timeout=BATCH_WINDOW_S))
+            except queue.Empty:
+                pass
+            groups = {}
+            for prefix, suffix, fut in pending:
+                groups.setdefault(prefix, []).append((suffix, fut))
+            for prefix, items in groups.items():
+                try:
+                    texts = self.generate(prefix, [s for s, _ in items])
+                except Exception as e:
+                    for _, fut in items:
+                        fut.set_exception(e)
+                    continue
+                for (_, fut), text in zip(items, texts):
+                    fut.set_result(text)
+
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = LocalEngine(os.getenv("LOCAL_MODEL", DEFAULT_MODEL))
+    return _engine
+
+
+def call_local_api(api_key, system_prompt, user_prompt, player_id, cost):
+    """
+    Run system + user prompts through the local model and return parsed JSON or raw text.
+    api_key is unused; it is kept so the signature matches the remote clients.
+    """
+    with tracing.span("client_init", provider="local"):
+        engine = get_engine()
+
+    with tracing.span("request", provider="local"):
+        raw = engine.submit(system_prompt, user_prompt).result().strip()
+
+    with tracing.span("parse", provider="local"):
+        # If it's fenced…
+        if raw.startswith("```"):
+            lines = raw.splitlines()
+            raw = "\n".join(lines[1:-1])
+
+        # Small models often follow the prompt's brace-less "key": "value" format literally
+        for candidate in (raw, "{" + raw.rstrip(",") + "}"):
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+        return {"raw_output": raw}
@@ -0,0 +1,87 @@
+import re
+import json
+import math
+from LLM_clients import tracing, usage
+
+# ---------------------------------------------------------------------
+# Decision probabilities from token log-probabilities.
+#
+# Instead of sampling the same prompt many times, one greedy call is made
+# with top-k log-probabilities.  The token carrying <d> in "a_i = <d>" is
+# located and P(a_i = 1) is read from the alternatives at that position,
+# renormalised over {0, 1} and tempered to the sampling temperature so it
+# is comparable with sampled runs.
+# ---------------------------------------------------------------------
+
+TOP_LOGPROBS = 20
+TEMPERATURE = 0.7
+
+
+def decision_probability(tokens, player_id, temperature=TEMPERATURE):
+    """
+    tokens: list of (token_text, [(alt_text, logprob), ...]) in output order.
+    Return P(a_{player_id} = 1), or None if the decision token cannot be found.
+    Anonymous prompts are answered as "a_i = <d>", which is matched as well.
+    """
+    text = "".join(tok for tok, _ in tokens)
+    m = re.search(rf"a_(?:{player_id}|i)\s*=\s*[01]", text)
+    if m is None:
+        return None
+    target = m.end() - 1  # character index of the decision digit
+
+    pos = 0
+    for tok, alternatives in tokens:
+        if pos <= target < pos + len(tok):
+            # alternatives must share whatever precedes the digit in this token (e.g. "=" or a space)
+            lead = tok[:target - pos].strip()
+            logp = {"0": [], "1": []}
+            for alt, lp in alternatives:
+                alt = alt.strip()
+                if not alt.startswith(lead):
+                    continue
+                digit, rest = alt[len(lead):len(lead) + 1], alt[len(lead) + 1:]
+                if digit in logp and not rest[:1].isdigit():
+                    logp[digit].append(lp)
+            if not logp["0"] and not logp["1"]:
+                return None
+            mass = {k: sum(math.exp(lp / temperature) for lp in v) for k, v in logp.items()}
+            return mass["1"] / (mass["0"] + mass["1"])
+        pos += len(tok)
+    return None
+
+
+def call_chat_with_logprobs(client, model, system_prompt, user_prompt, player_id, provider):
+    """
+    Greedy chat completion with top-k logprobs through an OpenAI-compatible client.
+    Returns the parsed response with "p_decision" added (None if logprobs were unavailable).
+    """
+    with tracing.span("request", provider=provider):
+        response = client.chat.completions.create(
+            model=model,
+            temperature=0,
+            logprobs=True,
+            top_logprobs=TOP_LOGPROBS,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user",   "content": user_prompt}
+            ]
+        )
+        usage.from_chat(response.usage, provider)
+
+    with tracing.span("parse", provider=provider):
+        choice = response.choices[0]
+        raw = choice.message.content.strip()
+        content = getattr(choice.logprobs, "content", None) or []
+        tokens = [(t.token, [(alt.token, alt.logprob) for alt in (t.top_logprobs or [])]) for t in content]
+        p_decision = decision_probability(tokens, player_id) if tokens else None
+
+        # If it's fenced…
+        if raw.startswith("```"):
+            lines = raw.splitlines()
+            raw = "\n".join(lines[1:-1])
+        try:
+            result = json.loads(raw)
+        except json.JSONDecodeError:
+            result = {"raw_output": raw}
+        result["p_decision"] = p_decision
+        return result
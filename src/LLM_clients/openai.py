@@ -1,35 +1,48 @@
 from openai import OpenAI
 import json
+from LLM_clients import tracing, usage
+from LLM_clients.logprobs import call_chat_with_logprobs
 
 def call_openai_api(api_key, system_prompt, user_prompt, player_id, cost):
-    client = OpenAI(api_key=api_key)
+    with tracing.span("client_init", provider="openai"):
+        client = OpenAI(api_key=api_key)
 
-    response = client.responses.create(
-        model="gpt-4o",
-        instructions=system_prompt,                 # replaces the 'system' role
-        input=[                                     # replaces the 'messages' list
-            {
-                "role": "user",
-                "content": [
-                    {"type": "input_text", "text": user_prompt}
-                ],
-            }
-        ],
-        temperature=0.7,
-        max_output_tokens=1024,
-    )
+    with tracing.span("request", provider="openai"):
+        response = client.responses.create(
+            model="gpt-4o",
+            instructions=system_prompt,                 # replaces the 'system' role
+            input=[                                     # replaces the 'messages' list
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": user_prompt}
+                    ],
+                }
+            ],
+            temperature=0.7,
+            max_output_tokens=1024,
+        )
+        usage.from_responses(response.usage)
 
-    raw = response.output_text.strip()
-    # If it’s fenced…
-    if raw.startswith("```"):
-        # drop first and last lines
-        lines = raw.splitlines()
-        raw = "\n".join(lines[1:-1])
-
-    try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
-        return {"raw_output": raw}
+    with tracing.span("parse", provider="openai"):
+        raw = response.output_text.strip()
+        # If it’s fenced…
+        if raw.startswith("```"):
+            # drop first and last lines
+            lines = raw.splitlines()
+            raw = "\n".join(lines[1:-1])
 
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return {"raw_output": raw}
 
 
+def call_openai_logprob_api(api_key, system_prompt, user_prompt, player_id, cost):
+    """
+    Single greedy call returning the parsed response plus "p_decision" = P(a_i = 1)
+    read from the decision token's log-probabilities (Chat Completions endpoint).
+    """
+    with tracing.span("client_init", provider="openai"):
+        client = OpenAI(api_key=api_key)
+    return call_chat_with_logprobs(client, "gpt-4o", system_prompt, user_prompt, player_id, "openai")
@@ -0,0 +1,85 @@
+import os
+import time
+import random
+import threading
+from LLM_clients import tracing, usage
+
+# ---------------------------------------------------------------------
+# Offline stand-in for a provider with automatic prefix caching.
+#
+# No model is called: the decision is drawn at random.  The stub keeps a
+# prompt-prefix cache like the hosted providers (a system prompt is cached
+# after its first use) and reports usage in the shape of the provider given
+# by STUB_USAGE_FORMAT (anthropic, responses or chat), passed through the
+# same parser as the real client.  Latency grows with the uncached input,
+# so sweeps, usage records and cache reports can be checked without keys.
+#
+# Environment:
+#   STUB_USAGE_FORMAT      anthropic | responses | chat   (default anthropic)
+#   STUB_MIN_CACHE_TOKENS  smallest cacheable prefix     (default 0)
+#   STUB_LATENCY_S         fixed latency per call        (default 0.02)
+#   STUB_S_PER_TOKEN       latency per uncached token    (default 1e-4)
+# ---------------------------------------------------------------------
+
+CHARS_PER_TOKEN = 4
+
+_cache = set()
+_cache_lock = threading.Lock()
+
+
+def _tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _usage_object(fmt, prefix_tokens, cached, written, user_tokens, output_tokens):
+    """Usage as the given provider reports it."""
+    if fmt == "anthropic":
+        return {
+            "input_tokens": prefix_tokens + user_tokens - cached - written,
+            "cache_read_input_tokens": cached,
+            "cache_creation_input_tokens": written,
+            "output_tokens": output_tokens,
+        }
+    if fmt == "responses":
+        return {
+            "input_tokens": prefix_tokens + user_tokens,
+            "input_tokens_details": {"cached_tokens": cached},
+            "output_tokens": output_tokens,
+        }
+    if fmt == "chat":
+        return {
+            "prompt_tokens": prefix_tokens + user_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+            "completion_tokens": output_tokens,
+        }
+    raise ValueError(f"Unknown STUB_USAGE_FORMAT: {fmt}")
+
+
+def call_stub_api(api_key, system_prompt, user_prompt, player_id, cost):
+    fmt = os.getenv("STUB_USAGE_FORMAT", "anthropic")
+    min_cache = int(os.getenv("STUB_MIN_CACHE_TOKENS", "0"))
+    latency = float(os.getenv("STUB_LATENCY_S", "0.02"))
+    s_per_token = float(os.getenv("STUB_S_PER_TOKEN", "1e-4"))
+
+    with tracing.span("request", provider="stub"):
+        prefix_tokens = _tokens(system_prompt)
+        cacheable = prefix_tokens >= min_cache
+        with _cache_lock:
+            hit = cacheable and system_prompt in _cache
+            if cacheable:
+                _cache.add(system_prompt)
+        cached = prefix_tokens if hit else 0
+        written = prefix_tokens if cacheable and not hit and fmt == "anthropic" else 0
+        user_tokens = _tokens(user_prompt)
+        time.sleep(latency + s_per_token * (prefix_tokens + user_tokens - cached))
+        result = {"cost": f"c = {cost}", "decision": f"a_{player_id} = {random.randint(0, 1)}"}
+
+    with tracing.span("parse", provider="stub"):
+        reported = _usage_object(fmt, prefix_tokens, cached, written, user_tokens, output_tokens=_tokens(str(result)))
+        if fmt == "anthropic":
+            usage.from_anthropic(reported, provider="stub")
+        elif fmt == "responses":
+            usage.from_responses(reported, provider="stub")
+        else:
+            usage.from_chat(reported, "stub")
+        return result
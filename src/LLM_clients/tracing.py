@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+# ---------------------------------------------------------------------
+# Lightweight span tracing for sweeps.
+#
+# Tracing is off by default: span() then returns a shared no-op context
+# manager, so instrumented code pays one global lookup per span.  When
+# enabled, spans are recorded in memory and can be exported as Chrome
+# trace-event JSON (open in Perfetto / chrome://tracing) or summarised
+# per phase.
+# ---------------------------------------------------------------------
+
+_NULL_SPAN = nullcontext()
+_tracer = None
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []  # (name, start_ns, end_ns, thread_id, thread_name, args)
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name, args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter_ns(), args)
+
+    def add(self, name, start_ns, end_ns, args=None):
+        thread = threading.current_thread()
+        with self._lock:
+            self.events.append((name, start_ns, end_ns, thread.ident, thread.name, args or {}))
+
+    def to_chrome(self, path):
+        """Write the recorded spans as Chrome trace-event JSON."""
+        pid = os.getpid()
+        trace_events, threads = [], {}
+        for name, start, end, tid, tname, args in self.events:
+            threads[tid] = tname
+            trace_events.append({
+                "name": name,
+                "cat": name.split(":")[0],
+                "ph": "X",
+                "ts": (start - self._t0) / 1e3,
+                "dur": (end - start) / 1e3,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        for tid, tname in threads.items():
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": tname}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self):
+        """Return {phase: {count, total_s, mean_s, p50_s, p95_s, max_s}}."""
+        durations = {}
+        for name, start, end, *_ in self.events:
+            durations.setdefault(name, []).append((end - start) / 1e9)
+        out = {}
+        for name, vals in sorted(durations.items()):
+            vals.sort()
+            out[name] = {
+                "count": len(vals),
+                "total_s": sum(vals),
+                "mean_s": sum(vals) / len(vals),
+                "p50_s": vals[len(vals) // 2],
+                "p95_s": vals[min(len(vals) - 1, int(0.95 * len(vals)))],
+                "max_s": vals[-1],
+            }
+        return out
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"{'phase':<24} {'count':>6} {'total s':>9} {'mean s':>8} {'p95 s':>8} {'max s':>8}")
+        for name, s in summary.items():
+            print(f"{name:<24} {s['count']:>6} {s['total_s']:>9.3f} {s['mean_s']:>8.3f} {s['p95_s']:>8.3f} {s['max_s']:>8.3f}")
+
+
+def enable():
+    """Start recording spans and return the active Tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def span(name, **args):
+    """Context manager timing a phase; a no-op unless tracing is enabled."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, args)
+
+
+def add_span(name, start_ns, end_ns, **args):
+    """Record a span measured elsewhere (e.g. queue wait) from perf_counter_ns timestamps."""
+    if _tracer is not None:
+        _tracer.add(name, start_ns, end_ns, args)
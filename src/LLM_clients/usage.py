@@ -0,0 +1,72 @@
+import threading
+
+# ---------------------------------------------------------------------
+# Per-call token usage, including prompt-cache hits.
+#
+# Clients call one of the from_* helpers with the usage object of their
+# response; the counts are kept per thread until the caller (line_network)
+# pops them into the result record.  Several requests made for one call
+# (e.g. a logprob attempt followed by a sampled fallback) are summed.
+#
+# Record fields:
+#   input_tokens        all prompt tokens, cached or not
+#   cached_tokens       prompt tokens served from the provider's cache
+#   cache_write_tokens  prompt tokens written to the cache (Anthropic)
+#   output_tokens
+# ---------------------------------------------------------------------
+
+FIELDS = ("input_tokens", "cached_tokens", "cache_write_tokens", "output_tokens")
+
+_local = threading.local()
+
+
+def record(provider, input_tokens=0, cached_tokens=0, cache_write_tokens=0, output_tokens=0):
+    usage = getattr(_local, "usage", None)
+    if usage is None:
+        usage = _local.usage = {"provider": provider, **{k: 0 for k in FIELDS}}
+    usage["input_tokens"] += input_tokens or 0
+    usage["cached_tokens"] += cached_tokens or 0
+    usage["cache_write_tokens"] += cache_write_tokens or 0
+    usage["output_tokens"] += output_tokens or 0
+
+
+def pop():
+    """Return the usage recorded on this thread since the last pop, or None."""
+    usage = getattr(_local, "usage", None)
+    _local.usage = None
+    return usage
+
+
+def _get(obj, name):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def from_anthropic(usage, provider="anthropic"):
+    """Messages API: input_tokens excludes cache reads and writes, which are reported separately."""
+    read = _get(usage, "cache_read_input_tokens") or 0
+    write = _get(usage, "cache_creation_input_tokens") or 0
+    record(provider,
+           input_tokens=(_get(usage, "input_tokens") or 0) + read + write,
+           cached_tokens=read,
+           cache_write_tokens=write,
+           output_tokens=_get(usage, "output_tokens"))
+
+
+def from_responses(usage, provider="openai"):
+    """OpenAI Responses API."""
+    record(provider,
+           input_tokens=_get(usage, "input_tokens"),
+           cached_tokens=_get(_get(usage, "input_tokens_details"), "cached_tokens"),
+           output_tokens=_get(usage, "output_tokens"))
+
+
+def from_chat(usage, provider):
+    """Chat Completions shape (OpenAI, Gemini's OpenAI-compatible endpoint, Mistral)."""
+    record(provider,
+           input_tokens=_get(usage, "prompt_tokens"),
+           cached_tokens=_get(_get(usage, "prompt_tokens_details"), "cached_tokens"),
+           output_tokens=_get(usage, "completion_tokens"))
@@ -0,0 +1,195 @@
+import os
+import json
+import argparse
+from collections import defaultdict
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from results_io import iter_decisions, iter_profiles
+from games import GAMES, DEFAULT_GAME, TOPOLOGIES, make_game
+from line_network import PROVIDERS, results_dir, get_pool, query_players
+
+# ------------------------------------------------------------
+# Adaptive cost grid around behavioural thresholds.
+#
+# Starting from a coarse cost grid, every grid point is sampled `reps`
+# times (one repetition = every player queried once).  The interval whose
+# estimated equilibrium probability or P(a_i = 1) changes most is then
+# bisected and its midpoint sampled, until the change is below
+# `tolerance`, intervals are narrower than `min_width`, or the call
+# budget is spent.  Calls therefore concentrate where a model switches
+# behaviour, and the switching cost (P(a_i = 1) crossing 1/2) is read
+# off the refined grid.
+#
+# Calls are appended to <results_dir>/adaptive_<neip>_<cfp>.jsonl, one
+# entry per call, so an interrupted search resumes where it stopped and
+# the results_baseline* files used by the other analyses stay untouched.
+# Grid points are keyed on the cost each call asked about
+# ("requested_cost"), never on the cost the model echoed back.
+# ------------------------------------------------------------
+COST_DECIMALS = 4
+
+
+def adaptive_path(provider, neip, cfp, game=DEFAULT_GAME, topology="line", estimation="sampling"):
+    return os.path.join(results_dir(provider, game, topology, estimation=estimation), f"adaptive_{neip}_{cfp}.jsonl")
+
+
+def estimates(path, game, n_players):
+    """
+    Return {cost: {"n": repetitions, "p1": mean P(a_i = 1), "p_eq": equilibrium probability}}.
+    P(a_i = 1) uses the logprob estimate of a call when present, its sampled action otherwise.
+    Costs are the requested ones (results_io.parse_decision), rounded like next_cost's midpoints.
+    """
+    if not os.path.exists(path):
+        return {}
+    p1 = defaultdict(list)
+
+    def decisions():
+        for rec in iter_decisions(path):
+            rec = rec._replace(cost=round(rec.cost, COST_DECIMALS))
+            p1[rec.cost].append(rec.action if rec.p_action is None else rec.p_action)
+            yield rec
+
+    profiles = defaultdict(list)
+    for _, _, _, cost, profile in iter_profiles(decisions(), n_players=n_players):
+        profiles[cost].append(profile)
+
+    out = {}
+    for cost, actions in p1.items():
+        reps = np.array(profiles.get(cost, []), dtype=np.int8).reshape(-1, n_players)
+        p_eq = float(game.equilibrium_mask(reps, cost).mean()) if n_players == game.n and len(reps) else np.nan
+        out[cost] = {"n": len(reps), "p1": float(np.mean(actions)), "p_eq": p_eq}
+    return out
+
+
+def next_cost(est, min_width, tolerance):
+    """Midpoint of the interval with the largest change in p1 or p_eq, or None when the search is done."""
+    costs = sorted(est)
+    best, best_score = None, tolerance
+    for lo, hi in zip(costs, costs[1:]):
+        if hi - lo < 2 * min_width:
+            continue
+        change = [abs(est[hi][k] - est[lo][k]) for k in ("p1", "p_eq")]
+        score = np.nanmax(change) if not np.isnan(change).all() else 0.0
+        if score > best_score:
+            best, best_score = round((lo + hi) / 2, COST_DECIMALS), score
+    return best
+
+
+def switching_cost(est):
+    """Cost where P(a_i = 1) crosses 1/2, linearly interpolated on the grid (None if it never does)."""
+    costs = sorted(est)
+    for lo, hi in zip(costs, costs[1:]):
+        a, b = est[lo]["p1"] - 0.5, est[hi]["p1"] - 0.5
+        if a == 0:
+            return lo
+        if a * b < 0:
+            return lo + (hi - lo) * a / (a - b)
+    return None
+
+
+def sample(provider, neip, cfp, cost, reps, players, path, next_id, **query_args):
+    """Run reps repetitions at cost and append them to path; return the next free repetition id."""
+    tasks = [(player_id, cost, cfp) for _ in range(reps) for player_id in players]
+    records = query_players(provider, neip, tasks, **query_args)
+    with open(path, "a") as f:
+        for i, rec in enumerate(records):
+            rec["requested_cost"] = cost
+            rec["experiment_id"] = next_id + i // len(players)
+            f.write(json.dumps(rec) + "\n")
+    return next_id + reps
+
+
+def search(provider, neip, cfp, costs, reps, budget, players, min_width, tolerance,
+           game=DEFAULT_GAME, topology="line", **query_args):
+    """Refine the cost grid for one provider and CFP; return the final estimates."""
+    network_game = make_game(game, topology)
+    path = adaptive_path(provider, neip, cfp, game, topology, query_args.get("estimation", "sampling"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    query_args.update(game=game, topology=topology)
+    n_players = len(players)
+
+    est = estimates(path, network_game, n_players)
+    next_id = max((rec.experiment_id for rec in iter_decisions(path)), default=-1) + 1 if est else 0
+    calls = 0
+
+    # coarse grid first, topped up to reps repetitions per cost
+    for cost in costs:
+        missing = min(reps - est.get(cost, {"n": 0})["n"], (budget - calls) // n_players)
+        if missing > 0:
+            next_id = sample(provider, neip, cfp, cost, missing, players, path, next_id, **query_args)
+            calls += missing * n_players
+
+    while calls + reps * n_players <= budget:
+        est = estimates(path, network_game, n_players)
+        cost = next_cost(est, min_width, tolerance)
+        if cost is None:
+            break
+        print(f"[{provider} {cfp}] refining at c = {cost}")
+        next_id = sample(provider, neip, cfp, cost, reps, players, path, next_id, **query_args)
+        calls += reps * n_players
+
+    print(f"[{provider} {cfp}] {calls} calls made")
+    return estimates(path, network_game, n_players)
+
+
+def plot_search(est, provider, neip, cfp, out_path):
+    costs = sorted(est)
+    fig, ax = plt.subplots(figsize=(6, 3.5))
+    ax.plot(costs, [est[c]["p1"] for c in costs], marker="o", label="P(a_i = 1)")
+    if not all(np.isnan(est[c]["p_eq"]) for c in costs):
+        ax.plot(costs, [est[c]["p_eq"] for c in costs], marker="s", label="P(equilibrium)")
+    for c in costs:
+        ax.annotate(str(est[c]["n"]), (c, est[c]["p1"]), textcoords="offset points", xytext=(0, 6),
+                    ha="center", fontsize=7, color="gray")
+    c_star = switching_cost(est)
+    if c_star is not None:
+        ax.axvline(c_star, color="gray", linestyle="--", linewidth=1, label=f"switch at c = {c_star:.3f}")
+    ax.set_xlabel("Cost")
+    ax.set_ylabel("Probability")
+    ax.set_ylim(-0.05, 1.05)
+    ax.set_title(f"{provider} | NEIP = {neip} | CFP = {cfp}")
+    ax.legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=300)
+    plt.close(fig)
+    print(f"Saved adaptive grid plot: {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Locate each model's switching cost with an adaptive cost grid.")
+    parser.add_argument("--provider", nargs="+", choices=sorted(PROVIDERS), required=True)
+    parser.add_argument("--cfp", nargs="+", type=str, default=["baseline"], help="Context Framing Perturbation")
+    parser.add_argument("--neip", type=str, default="baseline", help="Nash Equilibrium Invariant Perturbation")
+    parser.add_argument("--costs", nargs="+", type=float, default=[0.5, 1, 2], help="Coarse starting grid")
+    parser.add_argument("--players", nargs="+", type=int, default=None, help="Player IDs (default: all)")
+    parser.add_argument("--reps", type=int, default=10, help="Repetitions per sampled cost")
+    parser.add_argument("--budget", type=int, default=400, help="Maximum calls per provider and CFP")
+    parser.add_argument("--min_width", type=float, default=0.05, help="Do not refine intervals narrower than this")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Stop once no interval changes by more than this")
+    parser.add_argument("--game", choices=sorted(GAMES), default=DEFAULT_GAME)
+    parser.add_argument("--topology", choices=sorted(TOPOLOGIES), default="line")
+    parser.add_argument("--concurrency", type=int, default=1, help="Calls in flight per provider")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute per provider")
+    parser.add_argument("--estimation", choices=["sampling", "logprob"], default="sampling")
+    args = parser.parse_args()
+
+    players = args.players or list(range(1, make_game(args.game, args.topology).n + 1))
+    for prov in args.provider:
+        get_pool(prov, args.concurrency, args.rpm)
+        for cfp in args.cfp:
+            est = search(prov, args.neip, cfp, args.costs, args.reps, args.budget, players,
+                         args.min_width, args.tolerance, game=args.game, topology=args.topology,
+                         estimation=args.estimation)
+            print(f"{'cost':>8} {'n':>4} {'P(a_i=1)':>9} {'P(NE)':>6}")
+            for c in sorted(est):
+                print(f"{c:>8} {est[c]['n']:>4} {est[c]['p1']:>9.3f} {est[c]['p_eq']:>6.3f}")
+            c_star = switching_cost(est)
+            print(f"Switching cost: {'none in grid' if c_star is None else f'{c_star:.3f}'}")
+            path = adaptive_path(prov, args.neip, cfp, args.game, args.topology, args.estimation)
+            plot_search(est, prov, args.neip, cfp, os.path.splitext(path)[0] + ".png")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import os
-import glob
-import json
 from collections import defaultdict, Counter
 import matplotlib.pyplot as plt
 import numpy as np
+from results_io import iter_decisions, iter_profiles, experiment_id_from_path, results_files
 
 # ---------------------------------------------------------------------
 # 0. PATHS
@@ -15,52 +14,22 @@ tests_root_dir = os.path.join(dir_root, "tests")
 # 1. HELPER FUNCTIONS
 # ---------------------------------------------------------------------
 def process_file(path):
-    with open(path, "r") as f:
-        results = json.load(f)
-
-    scenarios = defaultdict(lambda: defaultdict(dict))  # cfp -> cost -> {player: decision}
-    for entry in results:
-        cfp      = entry.get("cfp")
-        resp     = entry["llm_response"]
-        cost     = float(resp["cost"].split("=")[1].strip())
-        pid      = int(resp["decision"].split("_")[1].split("=")[0].strip())
-        decision = int(resp["decision"].split("=")[1].strip())
-        scenarios[cfp][cost][pid] = decision
-
-    out = defaultdict(dict)
-    for cfp_key, cost_map in scenarios.items():
-        for cost, decisions in cost_map.items():
-            profile = tuple(decisions[i] for i in sorted(decisions))
-            out[cfp_key][cost] = profile
-    return out
+    """Stream (cfp, cost, profile) for every repetition stored in a results file."""
+    for _, _, cfp_key, cost, profile in iter_profiles(iter_decisions(path)):
+        yield cfp_key, cost, profile
 
-# ---------------------------------------------------------------------
-# 2. MAIN LOOP PER PROVIDER
-# ---------------------------------------------------------------------
-provider_dirs = [
-    os.path.join(tests_root_dir, d)
-    for d in os.listdir(tests_root_dir)
-    if os.path.isdir(os.path.join(tests_root_dir, d))
-]
-if not provider_dirs:
-    raise RuntimeError("No provider sub-folders found in /tests.")
-
-for provider_dir in provider_dirs:
-    provider = os.path.basename(provider_dir).capitalize()
-    files = sorted(
-        glob.glob(os.path.join(provider_dir, "results_baseline*.json")),
-        key=lambda fn: int(os.path.splitext(os.path.basename(fn))[0].split("_")[1])
-    )
-    if not files:
-        continue
-
-    # Aggregate counts
-    counts_by_cfp = defaultdict(lambda: defaultdict(Counter))  # cfp -> cost -> Counter(profile)
+def count_profiles(files):
+    """Return cfp -> cost -> Counter(profile) over all repetitions in files."""
+    counts_by_cfp = defaultdict(lambda: defaultdict(Counter))
     for fpath in files:
-        processed = process_file(fpath)
-        for cfp_key, cost_map in processed.items():
-            for cost, profile in cost_map.items():
-                counts_by_cfp[cfp_key][cost][profile] += 1
+        for cfp_key, cost, profile in process_file(fpath):
+            counts_by_cfp[cfp_key][cost][profile] += 1
+    return counts_by_cfp
+
+
+def plot_provider(counts_by_cfp, provider_dir):
+    """Draw the combined profile distribution figure (rows = CFPs, cols = costs) for one provider."""
+    provider = os.path.basename(provider_dir).capitalize()
 
     # Prepare global profile color mapping
     all_profiles = sorted({profile
@@ -115,3 +84,29 @@ for provider_dir in provider_dirs:
     fig.savefig(out_file, bbox_inches='tight')
     plt.close(fig)
     print(f"Saved combined figure: {out_file}")
+
+
+# ---------------------------------------------------------------------
+# 2. MAIN LOOP PER PROVIDER
+# ---------------------------------------------------------------------
+def main():
+    provider_dirs = [
+        os.path.join(tests_root_dir, d)
+        for d in os.listdir(tests_root_dir)
+        if os.path.isdir(os.path.join(tests_root_dir, d))
+    ]
+    if not provider_dirs:
+        raise RuntimeError("No provider sub-folders found in /tests.")
+
+    for provider_dir in provider_dirs:
+        files = sorted(
+            results_files(provider_dir, "results_baseline*"),
+            key=experiment_id_from_path
+        )
+        if not files:
+            continue
+        plot_provider(count_profiles(files), provider_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import os
+import sys
+import copy
+import json
+import mmap
+import zlib
+import glob
+import struct
+import hashlib
+import argparse
+import functools
+from array import array
+from collections import Counter
+from results_io import iter_entries, ARCHIVE_SUFFIX
+
+try:
+    import zstandard
+except ImportError:  # zlib with a preset dictionary is used instead
+    zstandard = None
+
+# ------------------------------------------------------------
+# Compressed, deduplicated archive of a results file.
+#
+# Layout (little endian):
+#     MAGIC | u32 header size | header JSON | dictionary
+#           | u64 chunk offsets (n_chunks + 1) | record chunks
+#           | u64 blob offsets (n_blobs + 1) | blobs
+#
+# - Fields with the same value in every entry (provider, game, neip, ...)
+#   are stored once in the header.
+# - Each distinct llm_response is stored once, keyed by the SHA-256 of its
+#   canonical JSON, and compressed on its own with a dictionary trained on
+#   the file's responses (zstd, or zlib's preset dictionary when zstandard
+#   is not installed).  Decisions repeat a lot and long raw outputs share
+#   most of their boilerplate, so both shrink well.
+# - The record table (remaining per-entry fields + blob id, one JSON line
+#   per record) is compressed in chunks of CHUNK_RECORDS lines.  With the
+#   chunk and blob offsets it gives random access to any record: a read
+#   decompresses one chunk and parses only the requested line, and at most
+#   CHUNK_CACHE chunks are kept, so memory stays bounded whatever the
+#   number of records.
+#
+# results_io.iter_entries reads archives transparently, so the analysis
+# scripts work on packed and unpacked directories alike.
+# ------------------------------------------------------------
+MAGIC = b"LNGARC1\n"
+VERSION = 2
+ZSTD_LEVEL = 19
+ZLIB_LEVEL = 9
+ZSTD_DICT_SIZE = 1 << 14
+ZLIB_DICT_SIZE = 1 << 15  # zlib only looks back 32 KB
+BLOB_CACHE = 4096
+CHUNK_RECORDS = 128
+CHUNK_CACHE = 128       # at most CHUNK_RECORDS * CHUNK_CACHE undecoded records in memory
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTS_DIR = os.path.join(ROOT_DIR, "tests")
+
+
+def default_codec():
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _canonical(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class _Codec:
+    def __init__(self, name, dictionary=b""):
+        self.name = name
+        if name == "zstd":
+            if zstandard is None:
+                raise ImportError("This archive is zstd-compressed: pip install zstandard")
+            zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=zdict)
+        elif name == "zlib":
+            self._zdict = dictionary
+        else:
+            raise ValueError(f"Unknown codec: {name}")
+
+    def compress(self, data):
+        if self.name == "zstd":
+            return self._compressor.compress(data)
+        c = zlib.compressobj(ZLIB_LEVEL, zdict=self._zdict) if self._zdict else zlib.compressobj(ZLIB_LEVEL)
+        return c.compress(data) + c.flush()
+
+    def decompress(self, data):
+        if self.name == "zstd":
+            return self._decompressor.decompress(data)
+        d = zlib.decompressobj(zdict=self._zdict) if self._zdict else zlib.decompressobj()
+        return d.decompress(data) + d.flush()
+
+
+def train_dictionary(blobs, counts, codec):
+    """Candidate dictionary for blobs (b"" when there is too little data to train on)."""
+    if codec == "zstd":
+        size = min(ZSTD_DICT_SIZE, sum(map(len, blobs)) // 4)
+        if len(blobs) < 8 or size < 256:
+            return b""
+        try:
+            return zstandard.train_dictionary(size, blobs).as_bytes()
+        except zstandard.ZstdError:
+            return b""
+    # zlib: the most referenced responses, most frequent last so they sit closest to the data
+    picked, total = [], 0
+    for i in sorted(range(len(blobs)), key=lambda i: -counts[i]):
+        if total + len(blobs[i]) > ZLIB_DICT_SIZE:
+            break
+        picked.append(blobs[i])
+        total += len(blobs[i])
+    return b"".join(reversed(picked))
+
+
+def write_archive(path, entries, codec=None):
+    """Write entries (result dicts) to an archive at path; return the number of distinct responses."""
+    entries = list(entries)
+    codec = codec or default_codec()
+
+    keys = list(dict.fromkeys(k for e in entries for k in e))
+    shared = {}
+    if entries:
+        shared = {k: v for k, v in entries[0].items()
+                  if k != "llm_response" and all(k in e and e[k] == v for e in entries)}
+
+    blob_ids, blobs, refs = {}, [], []
+    for e in entries:
+        if "llm_response" not in e:
+            refs.append(-1)
+            continue
+        data = _canonical(e["llm_response"])
+        digest = hashlib.sha256(data).digest()
+        if digest not in blob_ids:
+            blob_ids[digest] = len(blobs)
+            blobs.append(data)
+        refs.append(blob_ids[digest])
+    records = [{k: v for k, v in e.items() if k not in shared and k != "llm_response"} for e in entries]
+
+    # keep the dictionary only if it pays for itself
+    counts = Counter(refs)
+    plain = [_Codec(codec).compress(b) for b in blobs]
+    dictionary = train_dictionary(blobs, counts, codec)
+    if dictionary:
+        with_dict = [_Codec(codec, dictionary).compress(b) for b in blobs]
+        if len(dictionary) + sum(map(len, with_dict)) < sum(map(len, plain)):
+            plain = with_dict
+        else:
+            dictionary = b""
+
+    table_codec = _Codec(codec)
+    rows = [_canonical([ref, record]) for record, ref in zip(records, refs)]  # one JSON line per record
+    chunks = [table_codec.compress(b"\n".join(rows[i:i + CHUNK_RECORDS])) for i in range(0, len(rows), CHUNK_RECORDS)]
+    chunk_offsets, offsets = array("Q", [0]), array("Q", [0])
+    for c in chunks:
+        chunk_offsets.append(chunk_offsets[-1] + len(c))
+    for b in plain:
+        offsets.append(offsets[-1] + len(b))
+    header = _canonical({
+        "version": VERSION,
+        "codec": codec,
+        "keys": keys,
+        "shared": shared,
+        "n_records": len(entries),
+        "n_blobs": len(blobs),
+        "dict_size": len(dictionary),
+        "chunk_records": CHUNK_RECORDS,
+        "n_chunks": len(chunks),
+    })
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        f.write(dictionary)
+        f.write(chunk_offsets.tobytes())
+        for c in chunks:
+            f.write(c)
+        f.write(offsets.tobytes())
+        for b in plain:
+            f.write(b)
+    os.replace(tmp, path)
+    return len(blobs)
+
+
+class ArchiveReader:
+    """
+    Random access to an archive: len(reader), reader[i] and iteration return full result entries.
+    Record chunks and responses are decompressed on demand and only a few are kept, so memory
+    does not grow with the archive.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buf[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a results archive")
+        pos = len(MAGIC)
+        (size,) = struct.unpack_from("<I", self._buf, pos)
+        pos += 4
+        header = json.loads(self._buf[pos:pos + size])
+        pos += size
+        if header["version"] != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported archive version {header['version']} in {path}")
+        self.codec = header["codec"]
+        self.keys = header["keys"]
+        self.shared = header["shared"]
+
+        dictionary = self._buf[pos:pos + header["dict_size"]]
+        pos += header["dict_size"]
+        self._codec = _Codec(header["codec"], dictionary)
+        self._table_codec = _Codec(header["codec"])
+        self._n_records = header["n_records"]
+        self._chunk_records = header["chunk_records"]
+
+        self._chunk_offsets, pos = self._read_offsets(pos, header["n_chunks"])
+        self._chunk_start = pos
+        pos += self._chunk_offsets[-1]
+        self._offsets, self._blob_start = self._read_offsets(pos, header["n_blobs"])
+        self._chunk = functools.lru_cache(maxsize=CHUNK_CACHE)(self._read_chunk)
+        self._blob = functools.lru_cache(maxsize=BLOB_CACHE)(self._read_blob)
+
+    def _read_offsets(self, pos, n):
+        """The n + 1 u64 offsets at pos, and the position just after them."""
+        offsets = array("Q")
+        offsets.frombytes(self._buf[pos:pos + 8 * (n + 1)])
+        return offsets, pos + 8 * (n + 1)
+
+    def _read_chunk(self, c):
+        """Undecoded JSON lines of chunk c; only the record asked for is parsed."""
+        start = self._chunk_start + self._chunk_offsets[c]
+        return self._table_codec.decompress(self._buf[start:self._chunk_start + self._chunk_offsets[c + 1]]).split(b"\n")
+
+    def _read_blob(self, i):
+        start = self._blob_start + self._offsets[i]
+        return self._codec.decompress(self._buf[start:self._blob_start + self._offsets[i + 1]]).decode()
+
+    def __len__(self):
+        return self._n_records
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("archive record index out of range")
+        ref, record = json.loads(self._chunk(i // self._chunk_records)[i % self._chunk_records])
+        entry = {}
+        for k in self.keys:
+            if k == "llm_response":
+                if ref >= 0:
+                    entry[k] = json.loads(self._blob(ref))
+            elif k in self.shared:
+                v = self.shared[k]
+                entry[k] = copy.deepcopy(v) if isinstance(v, (dict, list)) else v
+            elif k in record:
+                entry[k] = record[k]
+        return entry
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if not self._buf.closed:
+            self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------------------------------------------------
+# Packing and unpacking results files
+# ------------------------------------------------------------
+def pack(path, codec=None):
+    """
+    Replace results_<...>.json by results_<...>.arc after checking the round trip.
+    If that archive already exists, the JSON entries are appended to it; the merged
+    archive is checked before it replaces the old one, so a failure loses nothing.
+    """
+    out = os.path.splitext(path)[0] + ARCHIVE_SUFFIX
+    entries = list(iter_entries(path))
+    if os.path.exists(out):
+        with ArchiveReader(out) as reader:
+            entries = list(reader) + entries
+    tmp = out + ".new"
+    write_archive(tmp, entries, codec)
+    with ArchiveReader(tmp) as reader:
+        ok = list(reader) == entries
+    if not ok:
+        os.remove(tmp)
+        raise RuntimeError(f"Round trip of {path} failed; kept the JSON file and any existing archive")
+    os.replace(tmp, out)
+    os.remove(path)
+    return out
+
+
+def unpack(path):
+    """Replace an archive by the indented JSON array line_network.py writes, merged with an existing one."""
+    out = os.path.splitext(path)[0] + ".json"
+    with ArchiveReader(path) as reader:
+        entries = list(reader)
+    if os.path.exists(out):
+        entries += list(iter_entries(out))
+    tmp = out + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp, out)
+    os.remove(path)
+    return out
+
+
+def _collect(paths, suffix):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files += glob.glob(os.path.join(p, "**", f"results_*{suffix}"), recursive=True)
+        else:
+            files.append(p)
+    return sorted(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack results files into compressed archives, or unpack them.")
+    parser.add_argument("command", choices=["pack", "unpack"])
+    parser.add_argument("paths", nargs="*", default=[TESTS_DIR], help="Results files or directories (default: tests/)")
+    parser.add_argument("--codec", choices=["zstd", "zlib"], default=None, help="Default: zstd if installed, else zlib")
+    args = parser.parse_args()
+
+    before = after = 0
+    if args.command == "pack":
+        for path in _collect(args.paths, ".json"):
+            size = os.path.getsize(path)
+            out = pack(path, args.codec)
+            before, after = before + size, after + os.path.getsize(out)
+    else:
+        for path in _collect(args.paths, ARCHIVE_SUFFIX):
+            size = os.path.getsize(path)
+            out = unpack(path)
+            before, after = before + size, after + os.path.getsize(out)
+    if not before:
+        print("No results files found.")
+        sys.exit(1)
+    print(f"{args.command}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({before / max(after, 1):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
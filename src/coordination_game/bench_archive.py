@@ -0,0 +1,110 @@
+import os
+import json
+import glob
+import time
+import random
+import argparse
+import tempfile
+import archive
+from results_io import iter_entries
+
+# ---------------------------------------------------------------------
+# On-disk size and read throughput: results JSON vs archives.
+#
+# Two datasets are measured: the results files under tests/ (short
+# decisions, many duplicates) and a generated file of chatty responses
+# whose free text lands in raw_output, as with verbose or reasoning
+# models.  For every format the total size, the sequential read rate
+# through results_io.iter_entries and, for archives, the random-access
+# rate of ArchiveReader[i] are reported.
+# ---------------------------------------------------------------------
+
+REASONING = [
+    "Let me think about the payoffs of Player {p} step by step.",
+    "If my neighbours choose a = {a}, matching them gives a payoff of {u} while deviating gives {v}.",
+    "The cost of coordinating is c = {c}, so coordinating is worth it only if at least {k} neighbours coordinate.",
+    "In the worst case no neighbour coordinates and my payoff is {w}; in the best case it is {b}.",
+    "Since the other players face the same trade-off, the profile where everyone plays {a} is stable.",
+    "I will therefore choose a_{p} = {a}.",
+]
+
+
+def chatty_entries(n, seed=0):
+    """n entries whose responses are long, partly repeated free-text reasoning."""
+    rng = random.Random(seed)
+    previous = []
+    for i in range(n):
+        p, cost = rng.randint(1, 4), rng.choice([0.5, 1.0, 1.5, 2.0])
+        if previous and rng.random() < 0.3:
+            text = rng.choice(previous)  # identical answers are common at temperature 0.7
+        else:
+            a = rng.randint(0, 1)
+            lines = [s.format(p=p, a=a, c=cost, u=rng.randint(0, 2), v=rng.randint(0, 2), k=rng.randint(1, 2),
+                              w=-cost, b=2 - cost) for s in REASONING for _ in range(rng.randint(1, 3))]
+            text = "\n".join(lines)
+            previous.append(text)
+        yield {
+            "provider": "openai",
+            "game": "coordination",
+            "neip": "baseline",
+            "cfp": rng.choice(["min", "safety", "peace"]),
+            "llm_response": {"raw_output": text},
+            "usage": {"input_tokens": rng.randint(600, 700), "cached_tokens": 0, "output_tokens": len(text) // 4},
+        }
+
+
+def read_rate(files):
+    start = time.perf_counter()
+    n = sum(1 for path in files for _ in iter_entries(path))
+    return n / (time.perf_counter() - start)
+
+
+def random_access_rate(files, lookups, seed=0):
+    rng = random.Random(seed)
+    readers = [archive.ArchiveReader(path) for path in files]
+    targets = [(r, rng.randrange(len(r))) for r in rng.choices(readers, weights=[len(r) for r in readers], k=lookups)]
+    start = time.perf_counter()
+    for reader, i in targets:
+        reader[i]
+    elapsed = time.perf_counter() - start
+    for reader in readers:
+        reader.close()
+    return lookups / elapsed
+
+
+def measure(name, json_files, codecs, lookups):
+    size = sum(os.path.getsize(p) for p in json_files)
+    print(f"{name:<10} {'json':<6} {size / 1e6:>9.2f} {'1.0x':>7} {read_rate(json_files):>12.0f} {'-':>12}")
+    for codec in codecs:
+        with tempfile.TemporaryDirectory() as tmp:
+            packed = []
+            for path in json_files:
+                out = os.path.join(tmp, os.path.splitext(os.path.basename(path))[0] + archive.ARCHIVE_SUFFIX)
+                archive.write_archive(out, iter_entries(path), codec)
+                packed.append(out)
+            arc_size = sum(os.path.getsize(p) for p in packed)
+            print(f"{name:<10} {codec:<6} {arc_size / 1e6:>9.2f} {size / arc_size:>6.1f}x "
+                  f"{read_rate(packed):>12.0f} {random_access_rate(packed, lookups):>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark results archives against JSON files.")
+    parser.add_argument("--chatty", type=int, default=20000, help="Entries in the generated chatty file")
+    parser.add_argument("--lookups", type=int, default=20000, help="Random record lookups per archive set")
+    args = parser.parse_args()
+
+    codecs = ["zstd", "zlib"] if archive.zstandard is not None else ["zlib"]
+    print(f"{'dataset':<10} {'format':<6} {'size MB':>9} {'ratio':>7} {'seq rec/s':>12} {'rand rec/s':>12}")
+    files = sorted(glob.glob(os.path.join(archive.TESTS_DIR, "**", "results_*.json"), recursive=True))
+    if files:
+        measure("tests/", files, codecs, args.lookups)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results_baseline_0.json")
+        with open(path, "w") as f:
+            json.dump(list(chatty_entries(args.chatty)), f, indent=2)
+        measure("chatty", [path], codecs, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
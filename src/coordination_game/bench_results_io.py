@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# ---------------------------------------------------------------------
+# Peak-RSS benchmark: streaming reader vs json.load on growing files.
+#
+# Each measurement runs in a fresh interpreter so ru_maxrss reflects only
+# that read.  The streaming column should stay flat as the file grows.
+# ---------------------------------------------------------------------
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+READERS = {
+    "stream": (
+        "from results_io import iter_decisions, iter_profiles\n"
+        "n = sum(1 for _ in iter_profiles(iter_decisions(path)))\n"
+    ),
+    "json.load": (
+        "import json\n"
+        "with open(path) as f: text = f.read()\n"
+        "if text.lstrip().startswith('['): data = json.loads(text)\n"
+        "else: data = [json.loads(l) for l in text.splitlines() if l.strip()]\n"
+        "n = len(data)\n"
+    ),
+}
+
+CHILD = """
+import sys, resource
+sys.path.insert(0, {here!r})
+path = {path!r}
+{body}
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_results(path, n_reps, jsonl=False):
+    """Write a consolidated results file with n_reps repetitions of a 4 player x 3 cost x 3 CFP sweep."""
+    with open(path, "w") as f:
+        if not jsonl:
+            f.write("[\n")
+        first = True
+        for rep in range(n_reps):
+            for pid in (1, 2, 3, 4):
+                for cost in (0.5, 1.0, 2.0):
+                    for cfp in ("min", "safety", "peace"):
+                        entry = {
+                            "provider": "openai",
+                            "neip": "baseline",
+                            "cfp": cfp,
+                            "experiment_id": rep,
+                            "llm_response": {"cost": f"c = {cost}", "decision": f"a_{pid} = {(rep + pid) % 2}"},
+                        }
+                        if jsonl:
+                            f.write(json.dumps(entry) + "\n")
+                        else:
+                            f.write(("" if first else ",\n") + json.dumps(entry, indent=2))
+                        first = False
+        if not jsonl:
+            f.write("\n]")
+
+
+def peak_rss_kb(path, reader):
+    code = CHILD.format(here=HERE, path=path, body=READERS[reader])
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return int(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark peak RSS of the results readers.")
+    parser.add_argument("--reps", nargs="+", type=int, default=[100, 1000, 10000, 50000],
+                        help="Repetitions per generated file")
+    parser.add_argument("--jsonl", action="store_true", help="Generate JSON lines instead of a JSON array")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'reps':>8} {'size MB':>9} " + " ".join(f"{r + ' MB':>12}" for r in READERS))
+        for n in args.reps:
+            path = os.path.join(tmp, f"results_baseline_{n}.json")
+            write_results(path, n, jsonl=args.jsonl)
+            size_mb = os.path.getsize(path) / 2**20
+            rss = {r: peak_rss_kb(path, r) / 1024 for r in READERS}
+            print(f"{n:>8} {size_mb:>9.1f} " + " ".join(f"{rss[r]:>12.1f}" for r in READERS))
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import os
 import glob
-import json
 from collections import defaultdict, Counter
 import matplotlib.pyplot as plt
 import numpy as np
+from results_io import iter_decisions, iter_profiles, results_files
 
 DIR_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 TESTS_DIR = os.path.join(DIR_ROOT, "tests")
@@ -17,42 +17,29 @@ MODEL_MAP = {
 
 
 def parse_file(path):
-    with open(path, 'r') as f:
-        data = json.load(f)
-    scenarios = defaultdict(lambda: defaultdict(dict))  # cost -> pid -> val
-    for entry in data:
-        if entry.get("cfp") != "min":
-            continue
-        resp = entry.get("llm_response", {})
-        dec = resp.get("decision", "")
-        if "=" not in dec:
-            continue
-        cost = float(resp.get("cost", "c=0").split("=")[1].strip())
-        pid_part, val_part = dec.split("=")
-        pid = int(pid_part.split("_")[1].strip())
-        val = int(val_part.strip())
-        scenarios[cost][pid] = val
-    out = {}
-    for cost, players in scenarios.items():
-        if len(players) == 4:
-            profile = tuple(players[i] for i in sorted(players))
-            out[cost] = profile
-    return out
+    """Stream (cost, profile) for every complete 'min' CFP profile in a results file."""
+    for _, _, cfp, cost, profile in iter_profiles(iter_decisions(path), n_players=4):
+        if cfp == "min":
+            yield cost, profile
 
 
 def aggregate(provider_dir, tag_pattern):
-    files = sorted(glob.glob(os.path.join(provider_dir, tag_pattern)))
+    files = results_files(provider_dir, tag_pattern)
     counts = defaultdict(Counter)  # cost -> Counter(profile)
     for fp in files:
-        parsed = parse_file(fp)
-        for cost, profile in parsed.items():
+        for cost, profile in parse_file(fp):
             counts[cost][profile] += 1
     return counts
 
 
 def plot_provider(provider_dir, provider):
-    baseline = aggregate(provider_dir, "results_baseline*.json")
-    neip100 = aggregate(provider_dir, "results_neip*.json")
+    baseline = aggregate(provider_dir, "results_baseline*")
+    neip100 = aggregate(provider_dir, "results_neip*")
+    plot_counts(baseline, neip100, provider)
+
+
+def plot_counts(baseline, neip100, provider):
+    """Draw baseline vs neip100 profile counts (rows) for every cost (columns)."""
     if not baseline and not neip100:
         return
     all_costs = sorted(set(baseline) | set(neip100))
@@ -0,0 +1,306 @@
+import abc
+import itertools
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+
+# ------------------------------------------------------------
+# Catalogue of binary-action network games.
+#
+# A game is a payoff rule over a sparse adjacency matrix.  Each rule only
+# needs u_i(a, a_-i) for a in {0, 1}, written in terms of the number of
+# neighbours playing 1 (k = A @ a) and the degree d; payoffs, best
+# responses and pure Nash equilibria then follow for a whole batch of
+# profiles (rows of a 0/1 matrix) at once.  Prompts are rendered from the
+# same definition, so adding a game means adding one subclass.
+# ------------------------------------------------------------
+
+
+# ------------------------------------------------------------
+# Topologies
+# ------------------------------------------------------------
+def line(n=4):
+    rows = np.arange(n - 1)
+    A = sp.coo_matrix((np.ones(n - 1), (rows, rows + 1)), shape=(n, n))
+    return (A + A.T).tocsr()
+
+
+def ring(n=4):
+    rows = np.arange(n)
+    A = sp.coo_matrix((np.ones(n), (rows, (rows + 1) % n)), shape=(n, n))
+    return ((A + A.T) > 0).astype(float).tocsr()
+
+
+def complete(n=4):
+    return sp.csr_matrix(np.ones((n, n)) - np.eye(n))
+
+
+TOPOLOGIES = {"line": line, "ring": ring, "complete": complete}
+TOPOLOGY_NAMES = {"line": "line", "ring": "ring", "complete": "complete network"}
+# label-free wiring, for prompts that must not name players (symmetry-aware sampling)
+TOPOLOGY_ANONYMOUS = {
+    "line": "Players sit in a row and each is connected to the players directly beside it, so the two players at the ends have one neighbour each.",
+    "ring": "Players sit in a circle and each is connected to the two players directly beside it.",
+    "complete": "Every player is connected to every other player.",
+}
+
+
+def all_profiles(n):
+    """Every pure profile as rows of an (2**n, n) 0/1 matrix, in lexicographic order."""
+    return np.array(list(itertools.product((0, 1), repeat=n)), dtype=np.int8)
+
+
+# ------------------------------------------------------------
+# Games
+# ------------------------------------------------------------
+class NetworkGame(abc.ABC):
+    name = None
+    title = None
+    action_labels = {1: "", 0: ""}
+    payoff_tex = None         # u_i as shown in the system prompt
+    payoff_notes = []         # definitions listed under the payoff
+    objective = None          # u_i in the user prompt, formatted with the player id {i} and {cost}
+    objective_notes = []      # definitions listed under the objective, formatted the same way
+
+    def __init__(self, topology="line", n=4):
+        self.topology = topology
+        self.n = n
+        self.A = TOPOLOGIES[topology](n)
+        self.degree = np.asarray(self.A.sum(axis=1)).ravel()
+
+    def neighbour_counts(self, profiles):
+        """k[p, i] = number of i's neighbours playing 1 in profile p."""
+        profiles = np.atleast_2d(profiles)
+        return np.asarray(self.A @ profiles.T).T
+
+    @abc.abstractmethod
+    def action_payoffs(self, k, cost):
+        """Return (u_i(0, a_-i), u_i(1, a_-i)) arrays shaped like k."""
+
+    def payoffs(self, profiles, cost):
+        """u_i(profile) for every profile (row) and player (column)."""
+        profiles = np.atleast_2d(profiles)
+        u0, u1 = self.action_payoffs(self.neighbour_counts(profiles), cost)
+        return np.where(profiles == 1, u1, u0)
+
+    def best_responses(self, profiles, cost):
+        """1 where playing 1 is a strict best response, 0 where 0 is, -1 on ties."""
+        u0, u1 = self.action_payoffs(self.neighbour_counts(profiles), cost)
+        return np.where(np.isclose(u0, u1), -1, (u1 > u0).astype(int))
+
+    def regrets(self, profiles, cost):
+        """Gain player i would get by switching action, floored at 0."""
+        profiles = np.atleast_2d(profiles)
+        u0, u1 = self.action_payoffs(self.neighbour_counts(profiles), cost)
+        gain = np.where(profiles == 1, u0 - u1, u1 - u0)
+        return np.maximum(gain, 0.0)
+
+    def equilibrium_mask(self, profiles, cost):
+        """True for profiles where no player gains by deviating (weak pure NE)."""
+        return (self.regrets(profiles, cost) <= 1e-12).all(axis=1)
+
+    # ------------------------------------------------------------
+    # Symmetries
+    # ------------------------------------------------------------
+    def automorphisms(self):
+        """
+        Player permutations (0-based rows) that leave the network unchanged.
+        Found by checking all n! orderings at once, which is fine for the small
+        networks played here (n <= 8).
+        """
+        A = self.A.toarray()
+        perms = np.array(list(itertools.permutations(range(self.n))))
+        same = (A[perms[:, :, None], perms[:, None, :]] == A).all(axis=(1, 2))
+        return perms[same]
+
+    def orbits(self):
+        """Structurally equivalent players, as sorted tuples of 1-based player IDs."""
+        images = self.automorphisms().T  # images[i] = every player i can be mapped to
+        return sorted({tuple(sorted(int(j) + 1 for j in set(row))) for row in images})
+
+    def pure_equilibria(self, cost):
+        profiles = all_profiles(self.n)
+        return [tuple(int(a) for a in p) for p in profiles[self.equilibrium_mask(profiles, cost)]]
+
+    def is_equilibrium(self, profile, cost):
+        return bool(self.equilibrium_mask(np.array([profile]), cost)[0])
+
+    # ------------------------------------------------------------
+    # Prompt rendering
+    #
+    # With anonymous=True players are never named: the network is described
+    # by its wiring and the player by its position (its degree and its
+    # neighbours' degrees), which is the same for every player of an orbit.
+    # Answers then read "a_i = <d>".
+    # ------------------------------------------------------------
+    def position_text(self, player_id):
+        """Label-free description of player_id's position, e.g. 'connected to 1 player, who is connected to 2 players'."""
+        i = player_id - 1
+        players = lambda k: f"{k} player" + ("s" if k != 1 else "")
+        counts = Counter(int(self.degree[j]) for j in self.A[i].indices)
+        if len(counts) == 1 and int(self.degree[i]) == 1:
+            ((d, _),) = counts.items()
+            return f"connected to 1 player, who is connected to {players(d)}"
+        parts = [f"{k} {'is' if k == 1 else 'are'} connected to {players(d)}" for d, k in sorted(counts.items())]
+        return f"connected to {players(int(self.degree[i]))}, of whom " + " and ".join(parts)
+
+    def topology_text(self, anonymous=False):
+        if anonymous:
+            return (f"    - There are {self.n} players, connected in a {TOPOLOGY_NAMES[self.topology]}.\n"
+                    f"    - {TOPOLOGY_ANONYMOUS[self.topology]}")
+        players = [f"Player {i + 1}" for i in range(self.n)]
+        lines = [
+            f"      - Player {i + 1} is connected to "
+            + " and ".join(f"Player {j + 1}" for j in self.A[i].indices) + "."
+            for i in range(self.n)
+        ]
+        return (f"    - There are {self.n} players: " + ", ".join(players[:-1]) + f", and {players[-1]}.\n"
+                f"    - Players are connected in a {TOPOLOGY_NAMES[self.topology]}:\n" + "\n".join(lines))
+
+    def system_prompt(self, neip="baseline", anonymous=False):
+        if neip == "baseline":
+            payoff = self.payoff_tex
+        elif neip == "global_scale":
+            payoff = f"100 * ({self.payoff_tex})"
+        else:
+            raise ValueError(f"Unknown NEIP: {neip}")
+        notes = "\n".join(f"    - {note}" for note in self.payoff_notes)
+        return f"""
+    You are participating in a {self.title} played on a {TOPOLOGY_NAMES[self.topology]}.
+
+    **Network Topology:**
+{self.topology_text(anonymous)}
+
+    **Strategy Space:**
+    - Each player chooses a strategy (a_i) from {{0, 1}}, where:
+      - a_i = 1: {self.action_labels[1]}
+      - a_i = 0: {self.action_labels[0]}
+
+    **Payoff Function:**
+    - Your payoff depends on your own strategy \\( a_i \\), the strategies of your neighbours, and the cost \\( c \\) of choosing \\( a_i = 1 \\):
+    \\[
+    u_i(a_i, a_{{-i}}) = {payoff},
+    \\]
+    where:
+{notes}
+    - \\( c > 0 \\): Cost of choosing \\( a_i = 1 \\).
+
+    **Game Rules:**
+    - You are assigned one {"position" if anonymous else "player"}.
+    - You will make a decision simultaneously with other players based on your current understanding of their potential strategies.
+    - The objective is to maximise your own payoff.
+
+    **Output Format:**
+    Respond in the following JSON format:
+      "cost": "c = {{cost}}",
+      "decision": "a_{"i" if anonymous else "{player_id}"} = <your decision>",
+    Do NOT write down anything else in your output.
+    """
+
+    def user_prompt(self, player_id, cost, anonymous=False):
+        """Long ('baseline' CFP) user prompt for this game."""
+        label = "i" if anonymous else player_id
+        objective = self.objective.format(i=label, cost=cost)
+        notes = "\n".join(f"    - {note.format(i=label, cost=cost)}" for note in self.objective_notes)
+        if anonymous:
+            intro = (f"You are a player in a {self.title} played on a {TOPOLOGY_NAMES[self.topology]}.  "
+                     f"You are {self.position_text(player_id)}.")
+            player = "you"
+        else:
+            intro = f"You are Player {player_id} in a {self.title} played on a {TOPOLOGY_NAMES[self.topology]}."
+            player = f"Player {player_id}"
+        player_id = label
+        return f"""{intro}
+
+    **Game Context:**
+    - You must decide whether a_{player_id} = 1 ({self.action_labels[1].rstrip('.').lower()}) or a_{player_id} = 0 ({self.action_labels[0].rstrip('.').lower()}).
+
+    **Current Situation:**
+    - The cost of choosing a_{player_id} = 1 is c = {cost}.
+
+    **Your Objective:**
+    - Maximise your payoff:
+    [
+    u_{player_id}(a_{player_id}, a_-{player_id}) = {objective},
+    ]
+    where:
+{notes}
+
+    **Your Task:**
+    1. Based on your position and the game's context, decide whether a_{player_id} = 0 or a_{player_id} = 1.
+    2. Evaluate your expected payoffs for both a_{player_id} = 0 and a_{player_id} = 1, explaining the worst and best-case outcomes.
+
+    **Output Format:**
+    Respond in the following format:
+      "cost": "c = {cost}",
+      "decision": "a_{player_id} = <your decision>",
+      "expected_payoff": "a_{player_id}=1: Best=<best expected payoff of {player} when playing 1>, Worst=<worst expected payoff of {player} when playing 1; a_{player_id}=0: Best=<best expected payoff of {player} when playing 0>, Worst=<worst expected payoff of {player} when playing 0>"
+    Do NOT write down anything else in your output.
+    """
+
+
+class CoordinationGame(NetworkGame):
+    """u_i = #neighbours matching a_i - c * a_i (strategic complements)."""
+    name = "coordination"
+    title = "coordination game"
+    action_labels = {1: "You coordinate.", 0: "You do not coordinate."}
+    payoff_tex = r"\sum_{j \in N(i)} \delta(a_i = a_j) - c \cdot a_i"
+    payoff_notes = [r"\( \delta(a_i = a_j) = 1 \) if your strategy matches your neighbour's strategy, and \( 0 \) otherwise."]
+    objective = "sum_j in N({i}) delta(a_{i} = a_j) - {cost} cdot a_{i}"
+    objective_notes = ["( delta(a_{i} = a_j) ): 1 if your strategy matches that of your neighbour ( j ), and 0 otherwise."]
+
+    def action_payoffs(self, k, cost):
+        return self.degree - k, k - cost
+
+
+class AntiCoordinationGame(NetworkGame):
+    """u_i = #neighbours differing from a_i - c * a_i."""
+    name = "anti_coordination"
+    title = "anti-coordination game"
+    action_labels = {1: "You take the costly role.", 0: "You take the free role."}
+    payoff_tex = r"\sum_{j \in N(i)} \delta(a_i \neq a_j) - c \cdot a_i"
+    payoff_notes = [r"\( \delta(a_i \neq a_j) = 1 \) if your strategy differs from your neighbour's strategy, and \( 0 \) otherwise."]
+    objective = "sum_j in N({i}) delta(a_{i} != a_j) - {cost} cdot a_{i}"
+    objective_notes = ["( delta(a_{i} != a_j) ): 1 if your strategy differs from that of your neighbour ( j ), and 0 otherwise."]
+
+    def action_payoffs(self, k, cost):
+        return k, self.degree - k - cost
+
+
+class BestShotGame(NetworkGame):
+    """Best-shot public good: u_i = 1 if i or a neighbour provides, minus c * a_i."""
+    name = "best_shot"
+    title = "best-shot public goods game"
+    action_labels = {1: "You provide the public good.", 0: "You do not provide the public good."}
+    payoff_tex = r"\max\big(a_i, \max_{j \in N(i)} a_j\big) - c \cdot a_i"
+    payoff_notes = [r"You receive 1 if you or at least one of your neighbours provides the good, and \( 0 \) otherwise."]
+    objective = "max(a_{i}, max_j in N({i}) a_j) - {cost} cdot a_{i}"
+    objective_notes = ["max(...) is 1 if you or at least one of your neighbours ( j ) provides the good, and 0 otherwise."]
+
+    def action_payoffs(self, k, cost):
+        return (k > 0).astype(float), np.ones_like(k, dtype=float) - cost
+
+
+class LinearQuadraticGame(NetworkGame):
+    """Linear-quadratic strategic substitutes: u_i = a_i - a_i^2 / 2 - delta * a_i * sum_j a_j - c * a_i."""
+    name = "linear_quadratic"
+    title = "linear-quadratic game of strategic substitutes"
+    action_labels = {1: "You invest.", 0: "You do not invest."}
+    delta = 0.5
+    payoff_tex = r"a_i - \tfrac{1}{2} a_i^2 - \delta \, a_i \sum_{j \in N(i)} a_j - c \cdot a_i"
+    payoff_notes = [r"\( \delta = 0.5 \): how much each investing neighbour reduces the value of your own investment."]
+    objective = "a_{i} - 1/2 a_{i}^2 - 0.5 cdot a_{i} sum_j in N({i}) a_j - {cost} cdot a_{i}"
+    objective_notes = ["0.5: how much each investing neighbour ( j ) reduces the value of your own investment."]
+
+    def action_payoffs(self, k, cost):
+        return np.zeros_like(k, dtype=float), 0.5 - self.delta * k - cost
+
+
+GAMES = {g.name: g for g in (CoordinationGame, AntiCoordinationGame, BestShotGame, LinearQuadraticGame)}
+DEFAULT_GAME = "coordination"
+
+
+def make_game(name=DEFAULT_GAME, topology="line", n=4):
+    if name not in GAMES:
+        raise ValueError(f"Unknown game: {name}")
+    return GAMES[name](topology, n)
@@ -1,9 +1,10 @@
 import os
 import glob
-import json
 from collections import defaultdict
 import numpy as np
 import matplotlib.pyplot as plt
+from results_io import iter_decisions, iter_profiles, results_files
+from games import make_game
 
 # ------------------------------------------------------------
 # Paths
@@ -11,6 +12,8 @@ import matplotlib.pyplot as plt
 DIR_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 TESTS_DIR = os.path.join(DIR_ROOT, "tests")
 
+GAME = make_game("coordination", "line", 4)
+
 # Mapping provider folder name
 MODEL_MAP = {
     "anthropic": "Claude 3.7 Sonnet",
@@ -23,38 +26,14 @@ MODEL_MAP = {
 # Helper functions
 # ------------------------------------------------------------
 def parse_file(path):
-    """Parse a results file and return {cfp: {cost: profile}}."""
-    with open(path, "r") as f:
-        data = json.load(f)
-
-    scenarios = defaultdict(lambda: defaultdict(dict))
-    for entry in data:
-        cfp = entry.get("cfp")
-        resp = entry.get("llm_response", {})
-        decision = resp.get("decision", "")
-        if "=" not in decision:
-            continue
-        cost = float(resp.get("cost", "c = 0").split("=")[1].strip())
-        pid_part, val_part = decision.split("=")
-        pid = int(pid_part.split("_")[1].strip())
-        val = int(val_part.strip())
-        scenarios[cfp][cost][pid] = val
-
-    out = defaultdict(dict)
-    for cfp_key, cost_map in scenarios.items():
-        for cost, decisions in cost_map.items():
-            profile = tuple(decisions[i] for i in sorted(decisions))
-            out[cfp_key][cost] = profile
-    return out
+    """Stream (cfp, cost, profile) for every repetition stored in a results file."""
+    for _, _, cfp_key, cost, profile in iter_profiles(iter_decisions(path)):
+        yield cfp_key, cost, profile
 
 
 def is_equilibrium(profile, cost):
-    all_zero = (0, 0, 0, 0)
-    all_one = (1, 1, 1, 1)
-    if cost > 1.0:
-        return profile == all_zero
-    else:
-        return profile in (all_zero, all_one) 
+    """Incomplete profiles (a player's answer could not be parsed) count as non-equilibria."""
+    return len(profile) == GAME.n and GAME.is_equilibrium(profile, cost)
 
 
 def main():
@@ -77,24 +56,26 @@ def main():
 
     for prov_dir in provider_dirs:
         prov = os.path.basename(prov_dir)
-        files = sorted(glob.glob(os.path.join(prov_dir, "results_baseline*.json")))
+        files = results_files(prov_dir, "results_baseline*")
         for fp in files:
-            parsed = parse_file(fp)
-            for cfp_key, cost_map in parsed.items():
+            for cfp_key, cost, profile in parse_file(fp):
                 all_cfps.add(cfp_key)
-                for cost, profile in cost_map.items():
-                    all_costs.add(cost)
-                    rec = results[cfp_key][prov][cost]
-                    rec['total'] += 1
-                    if is_equilibrium(profile, cost):
-                        rec['eq'] += 1
+                all_costs.add(cost)
+                rec = results[cfp_key][prov][cost]
+                rec['total'] += 1
+                if is_equilibrium(profile, cost):
+                    rec['eq'] += 1
 
     if not all_cfps:
         raise RuntimeError("No result files parsed")
 
-    provider_keys  = sorted(os.path.basename(d) for d in provider_dirs)
-    cost_values    = sorted(all_costs)
-    cfp_keys       = sorted(all_cfps)
+    # folders without baseline results (e.g. tests/mixed/) get no row
+    provider_keys = sorted({prov for cfp in results for prov in results[cfp]})
+    plot_heatmap(results, provider_keys, sorted(all_costs), sorted(all_cfps))
+
+
+def plot_heatmap(results, provider_keys, cost_values, cfp_keys, out_name="coordination_heatmap.png"):
+    """Draw one equilibrium-probability heatmap per CFP from results[cfp][provider][cost]."""
     provider_labels = [MODEL_MAP.get(p, p.capitalize()) for p in provider_keys]
 
     # build heatmaps
@@ -145,7 +126,7 @@ def main():
 
 
     fig.tight_layout()
-    out_path = os.path.join(TESTS_DIR, "coordination_heatmap.png")
+    out_path = os.path.join(TESTS_DIR, out_name)
     fig.savefig(out_path, bbox_inches="tight", dpi=300)
     plt.close(fig)
     print(f"Saved heatmap: {out_path}")
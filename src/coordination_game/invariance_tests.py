@@ -0,0 +1,243 @@
+import os
+import csv
+import glob
+import math
+import argparse
+import itertools
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from results_io import iter_decisions, iter_profiles, results_files
+
+# ------------------------------------------------------------
+# Permutation / exact tests of NEIP and CFP invariance.
+#
+# For every provider x cost x perturbation, the profile distribution under
+# the perturbation is compared with its reference (CFP 'min' for CFPs, the
+# baseline NEIP for numerical NEIPs).  Group labels are permuted in
+# vectorized batches and the batches are spread over worker processes.
+# When the number of distinct relabellings fits in the permutation budget
+# the test is exact (all relabellings are enumerated).
+# ------------------------------------------------------------
+DIR_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTS_DIR = os.path.join(DIR_ROOT, "tests")
+
+N_PLAYERS = 4
+REFERENCE_CFP = "min"
+REFERENCE_NEIP = "baseline"
+STATISTICS = ("chi2", "jsd", "tv")
+BATCH_SIZE = 10000
+EPS = 1e-12
+
+
+# ------------------------------------------------------------
+# Statistics, vectorized over a batch of relabellings
+# ------------------------------------------------------------
+def statistics(counts_a, counts_b):
+    """Return {name: array} for count matrices of shape (batch, n_profiles)."""
+    counts_a = np.asarray(counts_a, dtype=float)
+    counts_b = np.asarray(counts_b, dtype=float)
+    n_a = counts_a.sum(axis=-1, keepdims=True)
+    n_b = counts_b.sum(axis=-1, keepdims=True)
+    p = counts_a / n_a
+    q = counts_b / n_b
+
+    # Pearson chi-square on the 2 x K contingency table
+    col = counts_a + counts_b
+    total = n_a + n_b
+    exp_a = n_a * col / total
+    exp_b = n_b * col / total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi2 = np.where(col > 0, (counts_a - exp_a) ** 2 / exp_a + (counts_b - exp_b) ** 2 / exp_b, 0.0).sum(axis=-1)
+
+        # Jensen-Shannon divergence in bits
+        m = 0.5 * (p + q)
+        kl_p = np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=-1)
+        kl_q = np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=-1)
+    jsd = 0.5 * (kl_p + kl_q)
+
+    tv = 0.5 * np.abs(p - q).sum(axis=-1)
+    return {"chi2": chi2, "jsd": jsd, "tv": tv}
+
+
+def _exceedances(onehot, masks, observed):
+    """Count relabellings whose statistic is at least the observed one."""
+    counts_a = masks.astype(np.float64) @ onehot
+    counts_b = onehot.sum(axis=0) - counts_a
+    stats = statistics(counts_a, counts_b)
+    return {k: int((stats[k] >= observed[k] - EPS).sum()) for k in STATISTICS}
+
+
+def _random_job(args):
+    """Worker: draw n_perm random relabellings and count exceedances."""
+    codes, n_a, observed, n_perm, seed = args
+    rng = np.random.default_rng(seed)
+    onehot = np.eye(2 ** N_PLAYERS)[codes]
+    labels = np.zeros(len(codes), dtype=bool)
+    labels[:n_a] = True
+    hits = dict.fromkeys(STATISTICS, 0)
+    for start in range(0, n_perm, BATCH_SIZE):
+        size = min(BATCH_SIZE, n_perm - start)
+        masks = rng.permuted(np.tile(labels, (size, 1)), axis=1)
+        for k, v in _exceedances(onehot, masks, observed).items():
+            hits[k] += v
+    return hits
+
+
+def _exact_job(args):
+    """Worker: enumerate every relabelling and count exceedances."""
+    codes, n_a, observed = args
+    n = len(codes)
+    onehot = np.eye(2 ** N_PLAYERS)[codes]
+    hits = dict.fromkeys(STATISTICS, 0)
+    combos = itertools.combinations(range(n), n_a)
+    while True:
+        chunk = np.fromiter(itertools.chain.from_iterable(itertools.islice(combos, BATCH_SIZE)), dtype=np.intp)
+        if not chunk.size:
+            break
+        idx = chunk.reshape(-1, n_a)
+        masks = np.zeros((len(idx), n), dtype=bool)
+        np.put_along_axis(masks, idx, True, axis=1)
+        for k, v in _exceedances(onehot, masks, observed).items():
+            hits[k] += v
+    return hits
+
+
+# ------------------------------------------------------------
+# Multiple-comparison corrections
+# ------------------------------------------------------------
+def holm(pvals):
+    pvals = np.asarray(pvals, dtype=float)
+    order = np.argsort(pvals)
+    m = len(pvals)
+    adj = np.maximum.accumulate((m - np.arange(m)) * pvals[order])
+    out = np.empty(m)
+    out[order] = np.minimum(adj, 1.0)
+    return out
+
+
+def benjamini_hochberg(pvals):
+    pvals = np.asarray(pvals, dtype=float)
+    order = np.argsort(pvals)
+    m = len(pvals)
+    adj = pvals[order] * m / np.arange(1, m + 1)
+    adj = np.minimum.accumulate(adj[::-1])[::-1]
+    out = np.empty(m)
+    out[order] = np.minimum(adj, 1.0)
+    return out
+
+
+CORRECTIONS = {"holm": holm, "bh": benjamini_hochberg}
+
+
+# ------------------------------------------------------------
+# Data loading and test design
+# ------------------------------------------------------------
+def encode(profile):
+    return int("".join(map(str, profile)), 2)
+
+
+def load_samples(tests_dir=TESTS_DIR):
+    """Return {(provider, neip, cfp, cost): [profile codes]} for complete profiles."""
+    samples = defaultdict(list)
+    for prov_dir in sorted(d for d in glob.glob(os.path.join(tests_dir, "*")) if os.path.isdir(d)):
+        prov = os.path.basename(prov_dir)
+        for fp in results_files(prov_dir):
+            for _, neip, cfp, cost, profile in iter_profiles(iter_decisions(fp), n_players=N_PLAYERS):
+                samples[(prov, neip, cfp, cost)].append(encode(profile))
+    return samples
+
+
+def design(samples):
+    """List (provider, cost, perturbation, reference_key, perturbed_key) comparisons."""
+    tests = []
+    for (prov, neip, cfp, cost) in sorted(samples):
+        if neip == REFERENCE_NEIP and cfp != REFERENCE_CFP:
+            ref = (prov, REFERENCE_NEIP, REFERENCE_CFP, cost)
+            label = f"cfp:{cfp}"
+        elif neip != REFERENCE_NEIP:
+            ref = (prov, REFERENCE_NEIP, cfp, cost)
+            label = f"neip:{neip}/{cfp}"
+        else:
+            continue
+        if ref in samples:
+            tests.append((prov, cost, label, ref, (prov, neip, cfp, cost)))
+    return tests
+
+
+def run_tests(samples, tests, n_permutations, workers=None, seed=0):
+    """Run every test and return one row per test with raw p-values."""
+    seeds = np.random.SeedSequence(seed)
+    jobs, rows = [], []
+    for t_idx, (prov, cost, label, ref_key, pert_key) in enumerate(tests):
+        a, b = samples[pert_key], samples[ref_key]
+        codes = np.array(a + b)
+        onehot = np.eye(2 ** N_PLAYERS)[codes]
+        observed = {k: float(v[0]) for k, v in statistics(onehot[:len(a)].sum(0)[None], onehot[len(a):].sum(0)[None]).items()}
+        n_relabel = math.comb(len(codes), len(a))
+        exact = n_relabel <= n_permutations
+        if exact:
+            jobs.append((t_idx, _exact_job, (codes, len(a), observed)))
+            denom, offset = n_relabel, 0
+        else:
+            n_jobs = max(1, math.ceil(n_permutations / BATCH_SIZE / 4))
+            sizes = [n_permutations // n_jobs + (i < n_permutations % n_jobs) for i in range(n_jobs)]
+            for size, child in zip(sizes, seeds.spawn(n_jobs)):
+                jobs.append((t_idx, _random_job, (codes, len(a), observed, size, child)))
+            denom, offset = n_permutations + 1, 1
+        rows.append({
+            "provider": prov, "cost": cost, "perturbation": label,
+            "n_perturbed": len(a), "n_reference": len(b),
+            "method": "exact" if exact else "permutation",
+            "_denom": denom, "_offset": offset,
+            **{k: observed[k] for k in STATISTICS},
+        })
+
+    hits = [dict.fromkeys(STATISTICS, 0) for _ in rows]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(t_idx, pool.submit(fn, args)) for t_idx, fn, args in jobs]
+        for t_idx, fut in futures:
+            for k, v in fut.result().items():
+                hits[t_idx][k] += v
+
+    for row, h in zip(rows, hits):
+        denom, offset = row.pop("_denom"), row.pop("_offset")
+        for k in STATISTICS:
+            row[f"p_{k}"] = (h[k] + offset) / denom
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Permutation tests of NEIP/CFP invariance of profile distributions.")
+    parser.add_argument("--permutations", type=int, default=100000, help="Random relabellings per test")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--correction", choices=sorted(CORRECTIONS), default="holm", help="Multiple-comparison correction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=str, default=os.path.join(TESTS_DIR, "invariance_tests.csv"))
+    args = parser.parse_args()
+
+    samples = load_samples()
+    tests = design(samples)
+    if not tests:
+        raise RuntimeError(f"No perturbation/reference pairs found in {TESTS_DIR}")
+    rows = run_tests(samples, tests, args.permutations, workers=args.workers, seed=args.seed)
+
+    correct = CORRECTIONS[args.correction]
+    for k in STATISTICS:
+        for row, p_adj in zip(rows, correct([r[f"p_{k}"] for r in rows])):
+            row[f"p_{k}_{args.correction}"] = p_adj
+
+    with open(args.out, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{'provider':<10} {'cost':>5} {'perturbation':<24} {'TV':>5} {'JSD':>5} {'p_tv':>8} {'p_tv_' + args.correction:>10}")
+    for r in rows:
+        print(f"{r['provider']:<10} {r['cost']:>5} {r['perturbation']:<24} {r['tv']:>5.2f} {r['jsd']:>5.2f} "
+              f"{r['p_tv']:>8.4f} {r[f'p_tv_{args.correction}']:>10.4f}")
+    print(f"Saved test results: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
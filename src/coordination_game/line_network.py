@@ -1,67 +1,419 @@
 import argparse
 import json
+import time
+import random
+import threading
+import importlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import prompts
+import archive
+from results_io import iter_entries, parse_decision, results_files, ARCHIVE_SUFFIX
+from games import GAMES, DEFAULT_GAME, TOPOLOGIES, make_game
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import LLM_clients
+from LLM_clients import tracing, usage
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTS_DIR = os.path.join(ROOT_DIR, "tests")
+HISTORY_FILE = "call_history.jsonl"
+
+
+# provider -> (client module, sampling function, logprob function or None, API key variable or None)
+PROVIDERS = {
+    "anthropic": ("anthropic", "call_anthropic_api", None, "ANTHROPIC_API_KEY"),
+    "openai": ("openai", "call_openai_api", "call_openai_logprob_api", "OPENAI_API_KEY"),
+    "google": ("google", "call_gemini_api", "call_gemini_logprob_api", "GEMINI_API_KEY"),
+    "mistral": ("mistral", "call_mistral_api", None, "MISTRAL_API_KEY"),
+    "local": ("local", "call_local_api", None, None),  # no key needed; the model comes from LOCAL_MODEL
+    "stub": ("stub", "call_stub_api", None, None),     # offline stand-in, see LLM_clients/stub.py
+}
+
+
+def load_provider(provider):
+    """Return (call_llm_api, call_logprob_api or None, api_key) for a provider name."""
+    load_dotenv(os.path.join(ROOT_DIR, ".env"))
+
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {provider}")
+    module_name, call_name, logprob_name, key_var = PROVIDERS[provider]
+    module = importlib.import_module(f"LLM_clients.{module_name}")
+    call_llm_api = getattr(module, call_name)
+    call_logprob_api = getattr(module, logprob_name) if logprob_name else None
+    api_key = os.getenv(key_var) if key_var else provider
+
+    if not api_key:
+        raise ValueError("API key not found. Check your .env file.")
+    return call_llm_api, call_logprob_api, api_key
+
+
+class ProviderPool:
+    """
+    Client functions of one provider with its own limits: at most
+    `concurrency` calls in flight and, if rpm is set, at most `rpm` call
+    starts per minute.  Pools of different providers are independent, so
+    their calls overlap.
+    """
+
+    def __init__(self, provider, concurrency=1, rpm=None):
+        self.provider = provider
+        self.call_llm_api, self.call_logprob_api, self.api_key = load_provider(provider)
+        self.concurrency = max(1, concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=provider)
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def throttle(self):
+        """Block until this pool may start another call."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(provider, concurrency=1, rpm=None):
+    """Shared pool for provider; the limits apply when the pool is first created."""
+    with _pools_lock:
+        if provider not in _pools:
+            _pools[provider] = ProviderPool(provider, concurrency, rpm)
+        return _pools[provider]
+
+
+def results_dir(provider, game=DEFAULT_GAME, topology="line", symmetry="off", estimation="sampling"):
+    """
+    tests/<provider>/ for sampled runs of the coordination game on the line, and
+    tests/<provider>/<game>_<topology>[_<symmetry>][_logprob]/ otherwise: symmetry-aware
+    and greedy logprob runs are kept apart from the sampled data the analyses read.
+    """
+    suffix = ([symmetry] if symmetry != "off" else []) + (["logprob"] if estimation == "logprob" else [])
+    if not suffix and game == DEFAULT_GAME and topology == "line":
+        return os.path.join(TESTS_DIR, provider)
+    return os.path.join(TESTS_DIR, provider, "_".join([game, topology] + suffix))
+
+
+def assignment_label(assignment):
+    """Directory name of a mixed-model run, e.g. openai-openai-anthropic-anthropic."""
+    return "-".join(assignment[p] for p in sorted(assignment))
+
+
+def query_players(provider, neip, tasks, concurrency=1, estimation="sampling",
+                  game=DEFAULT_GAME, topology="line", rpm=None, anonymous=False):
+    """
+    Query provider for every (player_id, cost, cfp) in tasks and return the
+    result records in task order.  provider is a provider name or a
+    {player_id: provider} assignment.  Each record keeps the player and cost
+    it was asked about in "requested_player" and "requested_cost".  With
+    anonymous=True the prompts describe players by their position in the
+    network instead of their label (see games.NetworkGame.position_text).
+    Token usage reported by the provider (including prompt-cache hits) is
+    stored in each record's "usage"; latency, size and cache hits of every
+    call are appended to tests/<provider>/call_history.jsonl.
+    """
+    if isinstance(provider, dict):
+        assignment = provider
+    else:
+        assignment = {player_id: provider for player_id, _, _ in tasks}
+    network_game = make_game(game, topology)
+    pools = {prov: get_pool(prov, concurrency, rpm) for prov in sorted(set(assignment.values()))}
+    for prov, pool in pools.items():
+        if estimation == "logprob" and pool.call_logprob_api is None:
+            print(f"{prov} does not expose log-probabilities; falling back to sampling.")
+
+    history = defaultdict(list)
+    history_lock = threading.Lock()
+
+    def run_call(player_id, cost, cfp, submitted_ns):
+        player_provider = assignment[player_id]
+        pool = pools[player_provider]
+        if pool.concurrency > 1:  # one call at a time: the wait is just the previous calls
+            tracing.add_span("queue_wait", submitted_ns, time.perf_counter_ns())
+        with tracing.span("prompt", player=player_id, cost=cost, cfp=cfp):
+            user_prompt_template = prompts.get_user_prompt(player_id, cost, cfp=cfp, game=network_game, anonymous=anonymous)
+            user_prompt = user_prompt_template.format(player_id=player_id, cost=cost)
+            system_prompt = prompts.get_system_prompt(neip, game=network_game, anonymous=anonymous)
+        with tracing.span("rate_limit", provider=player_provider):
+            pool.throttle()
+        print(f"Calling {player_provider} for Player {player_id} with cost {cost} under {cfp}...")
+        usage.pop()  # drop anything left over from a failed call on this thread
+        start = time.perf_counter()
+        with tracing.span(f"call:{player_provider}", player=player_id, cost=cost, cfp=cfp):
+            result = None
+            if estimation == "logprob" and pool.call_logprob_api is not None:
+                result = pool.call_logprob_api(pool.api_key, system_prompt, user_prompt, player_id, cost)
+                if result.get("p_decision") is None:
+                    result = None  # no usable logprobs for this call: sample instead
+            if result is None:
+                result = pool.call_llm_api(pool.api_key, system_prompt, user_prompt, player_id, cost)
+        latency = time.perf_counter() - start
+        call_usage = usage.pop()
+        entry = {
+            "neip": neip,
+            "cfp": cfp,
+            "latency_s": latency,
+            "input_chars": len(system_prompt) + len(user_prompt),
+            "output_chars": len(json.dumps(result)),
+        }
+        if call_usage is not None:
+            entry.update({k: call_usage[k] for k in usage.FIELDS})
+        with history_lock:
+            history[player_provider].append(entry)
+        record = {
+                "provider": player_provider,
+                "game": game,
+                "neip": neip,
+                "cfp": cfp,
+                "requested_player": player_id,
+                "requested_cost": cost,
+                "estimation": estimation,
+                "llm_response": result
+            }
+        if anonymous:
+            record["anonymous"] = True
+        if call_usage is not None:
+            record["usage"] = call_usage
+        if isinstance(provider, dict):
+            record["assignment"] = {str(p): prov for p, prov in sorted(assignment.items())}
+        return record
+
+    # Run experiments: each call goes to the pool of the provider playing that player
+    futures = [pools[assignment[task[0]]].executor.submit(run_call, *task, time.perf_counter_ns()) for task in tasks]
+    results = [f.result() for f in futures]
+
+    for prov, calls in history.items():
+        # latency history stays per provider, where the sweep planner reads it
+        prov_dir = os.path.join(TESTS_DIR, prov)
+        os.makedirs(prov_dir, exist_ok=True)
+        with open(os.path.join(prov_dir, HISTORY_FILE), "a") as f:
+            f.writelines(json.dumps(h) + "\n" for h in calls)
+    return results
+
+
+def orbit_representatives(network_game, players):
+    """{player_id: representative}: the smallest requested player of each automorphism orbit."""
+    rep_of = {}
+    for orbit in network_game.orbits():
+        requested = [p for p in orbit if p in players]
+        for p in requested:
+            rep_of[p] = requested[0]
+    return rep_of
+
+
+def queried_actions(provider_dir, neip):
+    """
+    {(cfp, cost, player): [actions]} of the answers actually queried in earlier results files,
+    keyed on the requested cost (see results_io.parse_decision).
+    """
+    actions = defaultdict(list)
+    for path in results_files(provider_dir, f"results_{neip}_*"):
+        for entry in iter_entries(path):
+            rec = parse_decision(entry)
+            if rec is not None and "imputed_from" not in entry:
+                actions[(rec.cfp, rec.cost, rec.player)].append(rec.action)
+    return actions
+
+
+def impute_orbits(rep_results, rep_tasks, tasks, rep_of, symmetry, game, neip, pool):
+    """
+    Full result list for tasks from the answers of the orbit representatives.
+    Equivalent players copy the representative's decision ("reuse") or draw
+    one from everything the representative answered in that cell ("resample").
+    pool is keyed on the requested (cfp, cost, player) of each task; when it
+    holds nothing for a cell, the representative's own answer is used.
+    """
+    by_task = dict(zip(rep_tasks, rep_results))
+    for (player_id, cost, cfp), rec in by_task.items():
+        decision = parse_decision(rec)
+        if decision is not None:
+            pool[(cfp, cost, player_id)].append(decision.action)
+
+    results = []
+    for player_id, cost, cfp in tasks:
+        rep = rep_of[player_id]
+        rec = by_task[(rep, cost, cfp)]
+        if rep == player_id:
+            results.append(rec)
+            continue
+        decision = parse_decision(rec)
+        if decision is None:
+            continue  # nothing to impute from an unparsable answer
+        answers = pool.get((cfp, cost, rep)) if symmetry == "resample" else None
+        action = random.choice(answers) if answers else decision.action
+        results.append({
+            "provider": rec["provider"],
+            "game": game,
+            "neip": neip,
+            "cfp": cfp,
+            "requested_player": player_id,
+            "requested_cost": cost,
+            "llm_response": {"cost": f"c = {cost}", "decision": f"a_{player_id} = {action}"},
+            "imputed_from": rep,
+            "symmetry": symmetry,
+        })
+    return results
+
+
+def run_experiment(provider, neip, experiment_id, tasks, concurrency=1, estimation="sampling", append=False,
+                   game=DEFAULT_GAME, topology="line", rpm=None, symmetry="off"):
+    """
+    Query provider for every (player_id, cost, cfp) in tasks and save them to
+    results_<neip>_<experiment_id>.json in results_dir().  With append=True,
+    entries already in that file are kept, so a sweep can fill in missing
+    cells of a repetition.  A repetition that was packed with archive.py
+    stays packed: its .arc file is rewritten instead.
+
+    provider may also be a {player_id: provider} assignment, in which case
+    each player is played by its own model and the results go to
+    tests/mixed/<assignment_label>/.
+
+    With symmetry="reuse" or "resample", only one representative per
+    automorphism orbit of the network is queried, with prompts that describe
+    positions instead of player labels, and the equivalent players'
+    decisions are imputed from it (see impute_orbits).
+    """
+    if isinstance(provider, dict):
+        if symmetry != "off":
+            raise ValueError("Symmetry-aware sampling needs one model for every player")
+        provider_dir = results_dir(os.path.join("mixed", assignment_label(provider)), game, topology,
+                                   estimation=estimation)
+    else:
+        provider_dir = results_dir(provider, game, topology, symmetry, estimation)
+    os.makedirs(provider_dir, exist_ok=True)
+    query_args = dict(concurrency=concurrency, estimation=estimation, game=game, topology=topology, rpm=rpm)
+    if symmetry == "off":
+        results = query_players(provider, neip, tasks, **query_args)
+    else:
+        rep_of = orbit_representatives(make_game(game, topology), {player_id for player_id, _, _ in tasks})
+        rep_tasks = [task for task in tasks if rep_of[task[0]] == task[0]]
+        pool = queried_actions(provider_dir, neip) if symmetry == "resample" else defaultdict(list)
+        rep_results = query_players(provider, neip, rep_tasks, anonymous=True, **query_args)
+        results = impute_orbits(rep_results, rep_tasks, tasks, rep_of, symmetry, game, neip, pool)
+        print(f"Queried {len(rep_tasks)} of {len(tasks)} calls ({symmetry} over orbits).")
+
+    # Save results
+    out_path = os.path.join(provider_dir, f"results_{neip}_{experiment_id}.json")
+    arc_path = os.path.splitext(out_path)[0] + ARCHIVE_SUFFIX
+    with tracing.span("write"):
+        if os.path.exists(arc_path):
+            # never leave a .json next to the archive of the same repetition
+            with archive.ArchiveReader(arc_path) as reader:
+                codec = reader.codec
+                if append:
+                    results = list(reader) + results
+            archive.write_archive(arc_path, results, codec)
+        else:
+            if append and os.path.exists(out_path):
+                with open(out_path) as f:
+                    results = json.load(f) + results
+            with open(out_path, "w") as f:
+                json.dump(results, f, indent=2)
+    print(f"Results saved for {os.path.relpath(provider_dir, TESTS_DIR)} in experiment {experiment_id}.")
+    return results
+
+
+def parse_limit(values, cast):
+    """
+    Parse ["4"] (every provider) or ["openai=8", "anthropic=2"] into
+    (default, {provider: value}); a bare value sets the default.
+    """
+    default, per_provider = None, {}
+    for value in values or []:
+        if "=" in value:
+            prov, v = value.split("=", 1)
+            per_provider[prov] = cast(v)
+        else:
+            default = cast(value)
+    return default, per_provider
+
+
+def parse_assignment(values):
+    """Parse ["1:openai", "2:openai", "3-4:anthropic"] into {player_id: provider}."""
+    assignment = {}
+    for value in values:
+        players, _, prov = value.partition(":")
+        if prov not in PROVIDERS:
+            raise ValueError(f"Unknown provider in assignment: {value}")
+        first, _, last = players.partition("-")
+        for player_id in range(int(first), int(last or first) + 1):
+            assignment[player_id] = prov
+    return assignment
+
 
 def main():
     # Parse command-line arguments
-    parser = argparse.ArgumentParser(description="Run a coordination game on a line network.")
+    parser = argparse.ArgumentParser(description="Run a network game (by default the coordination game on a line network).")
     parser.add_argument("--players", nargs="+", type=int, required=True, help="List of player IDs (1 2 3 4)")
     parser.add_argument("--costs", nargs="+", type=float, required=True, help="List of cost values (e.g., 0.1 0.5 1.0)")
     parser.add_argument("--experiment_id", type=int, required=True, help="Experiment iteration number")
-    parser.add_argument("--provider", type=str, required=True, default = "google")
-    parser.add_argument("--cfp", nargs="+", type=str, default="baseline", help="Context Framing Perturbation")
+    parser.add_argument("--provider", nargs="+", choices=sorted(PROVIDERS), default=None,
+                        help="One or more providers; several providers run concurrently, each to tests/<provider>/")
+    parser.add_argument("--assignment", nargs="+", default=None,
+                        help="Mixed-model game: player-to-provider map such as 1-2:openai 3-4:anthropic; results go to tests/mixed/")
+    parser.add_argument("--cfp", nargs="+", type=str, default=["baseline"], help="Context Framing Perturbation")
     parser.add_argument("--neip", type=str, default="baseline", help="Nash Equilibrium Invariant Perturbation")
+    parser.add_argument("--game", choices=sorted(GAMES), default=DEFAULT_GAME, help="Network game to play (see games.py)")
+    parser.add_argument("--topology", choices=sorted(TOPOLOGIES), default="line", help="Network topology")
+    parser.add_argument("--symmetry", choices=["off", "reuse", "resample"], default="off",
+                        help="Query one player per automorphism orbit and reuse or resample its answers for equivalent players")
+    parser.add_argument("--concurrency", nargs="+", default=["1"],
+                        help="Calls in flight per provider: N for every provider, or provider=N pairs")
+    parser.add_argument("--rpm", nargs="+", default=None,
+                        help="Requests per minute per provider: N for every provider, or provider=N pairs")
+    parser.add_argument("--estimation", choices=["sampling", "logprob"], default="sampling",
+                        help="logprob: read P(a_i=1) from token log-probabilities (openai, google); others fall back to sampling")
+    parser.add_argument("--trace", type=str, default=None, help="Write a Chrome trace of the sweep to this path")
     args = parser.parse_args()
-    
-    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    load_dotenv(os.path.join(root_dir, ".env"))
-    base_tests_dir = os.path.join(root_dir, "tests")
-    provider_dir = os.path.join(base_tests_dir, args.provider)
-    os.makedirs(provider_dir, exist_ok=True)
+    if bool(args.provider) == bool(args.assignment):
+        parser.error("give either --provider or --assignment")
+    if args.assignment and args.symmetry != "off":
+        parser.error("--symmetry needs one model for every player; it cannot be combined with --assignment")
 
-    # Load API key and appropriate function
-    if args.provider == "anthropic":
-        from LLM_clients.anthropic import call_anthropic_api as call_llm_api
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-    elif args.provider == "openai":
-        from LLM_clients.openai import call_openai_api as call_llm_api
-        api_key = os.getenv("OPENAI_API_KEY")
-    elif args.provider == "google":
-        from LLM_clients.google import call_gemini_api as call_llm_api
-        api_key = os.getenv("GEMINI_API_KEY")
-    elif args.provider == "mistral":
-        from LLM_clients.mistral import call_mistral_api as call_llm_api
-        api_key = os.getenv("MISTRAL_API_KEY")
+    tracer = tracing.enable() if args.trace else None
 
-    if not api_key:
-        raise ValueError("API key not found. Check your .env file.")
+    if args.assignment:
+        assignment = parse_assignment(args.assignment)
+        missing = set(args.players) - set(assignment)
+        if missing:
+            parser.error(f"no provider assigned to players {sorted(missing)}")
+        runs = [{p: assignment[p] for p in args.players}]
+        providers = sorted(set(runs[0].values()))
+    else:
+        runs = providers = args.provider
 
-   # Run experiments
-    results = []
-    for player_id in args.players:
-        for cost in args.costs:
-            for cfp in args.cfp:       
-                user_prompt_template = prompts.get_user_prompt(player_id, cost, cfp=cfp)
-                user_prompt = user_prompt_template.format(player_id=player_id, cost=cost)
-                print(f"Calling {args.provider} for Player {player_id} with cost {cost} under {cfp}...")
-                system_prompt = prompts.get_system_prompt(args.neip)
-                result = call_llm_api(api_key, system_prompt, user_prompt, player_id, cost)
-                results.append({
-                        "provider": args.provider,
-                        "neip": args.neip,
-                        "cfp": cfp,
-                        "llm_response": result
-                    })
+    # set up every provider's pool with its own limits before any call is made
+    default_concurrency, concurrency = parse_limit(args.concurrency, int)
+    default_rpm, rpm = parse_limit(args.rpm, float)
+    for prov in providers:
+        get_pool(prov, concurrency.get(prov, default_concurrency or 1), rpm.get(prov, default_rpm))
 
-    # Save results
-    with open(os.path.join(provider_dir, f"results_{args.neip}_{args.experiment_id}.json"), "w") as f:
-        json.dump(results, f, indent=2)
-    print(f"Results saved for {args.provider} in experiment {args.experiment_id}.")
+    tasks = [(player_id, cost, cfp) for player_id in args.players for cost in args.costs for cfp in args.cfp]
+    with ThreadPoolExecutor(max_workers=len(runs)) as runner:
+        futures = [
+            runner.submit(run_experiment, run, args.neip, args.experiment_id, tasks,
+                          estimation=args.estimation, game=args.game, topology=args.topology,
+                          symmetry=args.symmetry)
+            for run in runs
+        ]
+        for f in futures:
+            f.result()
+
+    if tracer is not None:
+        tracer.to_chrome(args.trace)
+        with open(os.path.splitext(args.trace)[0] + "_summary.json", "w") as f:
+            json.dump(tracer.summary(), f, indent=2)
+        tracer.print_summary()
+        print(f"Trace saved to {args.trace}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
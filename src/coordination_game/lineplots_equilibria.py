@@ -1,10 +1,10 @@
 import os
 import glob
-import json
 import math
 from collections import defaultdict
 import numpy as np
 import matplotlib.pyplot as plt
+from results_io import iter_decisions, iter_profiles, results_files
 
 DIR_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 TESTS_DIR = os.path.join(DIR_ROOT, "tests")
@@ -18,30 +18,9 @@ MODEL_MAP = {
 
 
 def parse_file(path):
-    """Parse a results file and return {cfp: {cost: profile}}."""
-    with open(path, "r") as f:
-        data = json.load(f)
-
-    scenarios = defaultdict(lambda: defaultdict(dict))
-    for entry in data:
-        cfp = entry.get("cfp")
-        resp = entry.get("llm_response", {})
-        dec  = resp.get("decision", "")
-        if "=" not in dec:
-            continue
-        cost = float(resp.get("cost", "c=0").split("=")[1].strip())
-        pid_part, val_part = dec.split("=")
-        pid = int(pid_part.split("_")[1].strip())
-        val = int(val_part.strip())
-        scenarios[cfp][cost][pid] = val
-
-    out = defaultdict(dict)
-    for cfp_key, cost_map in scenarios.items():
-        for cost, decisions in cost_map.items():
-            if len(decisions) == 4:
-                profile = tuple(decisions[i] for i in sorted(decisions))
-                out[cfp_key][cost] = profile
-    return out
+    """Stream (cfp, cost, profile) for every repetition stored in a results file."""
+    for _, _, cfp_key, cost, profile in iter_profiles(iter_decisions(path), n_players=4):
+        yield cfp_key, cost, profile
 
 
 def is_equilibrium(profile, cost):
@@ -68,19 +47,19 @@ def aggregate():
     all_cfps = set()
     for prov_dir in provider_dirs:
         prov = os.path.basename(prov_dir)
-        files = sorted(glob.glob(os.path.join(prov_dir, "results_baseline*.json")))
+        files = results_files(prov_dir, "results_baseline*")
         for fp in files:
-            parsed = parse_file(fp)
-            for cfp_key, cost_map in parsed.items():
+            for cfp_key, cost, profile in parse_file(fp):
                 all_cfps.add(cfp_key)
-                for cost, profile in cost_map.items():
-                    all_costs.add(cost)
-                    rec = results[cfp_key][prov][cost]
-                    rec["total"] += 1
-                    if is_equilibrium(profile, cost):
-                        rec["eq"] += 1
-                    rec["dist"] += hamming_distance(profile, cost)
-    return results, sorted(all_costs), sorted(all_cfps), [os.path.basename(d) for d in provider_dirs]
+                all_costs.add(cost)
+                rec = results[cfp_key][prov][cost]
+                rec["total"] += 1
+                if is_equilibrium(profile, cost):
+                    rec["eq"] += 1
+                rec["dist"] += hamming_distance(profile, cost)
+    providers = [os.path.basename(d) for d in provider_dirs
+                 if any(os.path.basename(d) in results[cfp] for cfp in results)]
+    return results, sorted(all_costs), sorted(all_cfps), providers
 
 
 def plot_equilibrium_prob(results, costs, providers, cfps):
@@ -0,0 +1,76 @@
+import os
+import glob
+from collections import defaultdict
+import numpy as np
+from results_io import iter_decisions, results_files
+from heatmap_equilibria import TESTS_DIR, GAME, plot_heatmap
+from games import all_profiles
+
+# ------------------------------------------------------------
+# Analytic profile and equilibrium probabilities from logprob runs.
+#
+# Runs made with `line_network.py --estimation logprob` store P(a_i = 1)
+# for each player.  Assuming players decide independently, the probability
+# of every profile is the product of the per-player marginals, so the
+# equilibrium probability follows without repeated sampling.  These runs
+# live in tests/<provider>/coordination_line_logprob/ (results_dir), apart
+# from the sampled results.
+# ------------------------------------------------------------
+N_PLAYERS = 4
+PROFILES = all_profiles(N_PLAYERS)  # (16, n)
+
+
+def load_marginals(tests_dir=TESTS_DIR):
+    """
+    Return {(provider, neip, cfp, cost): p} with p[i] = mean P(a_{i+1} = 1) over repetitions.
+    A call that fell back to sampling contributes its sampled action instead.
+    """
+    from line_network import results_dir  # deferred: line_network loads the provider clients
+
+    sums = defaultdict(lambda: np.zeros(N_PLAYERS))
+    counts = defaultdict(lambda: np.zeros(N_PLAYERS))
+    for prov_dir in glob.glob(os.path.join(tests_dir, "*")):
+        if not os.path.isdir(prov_dir):
+            continue
+        prov = os.path.basename(prov_dir)
+        logprob_dir = results_dir(prov, estimation="logprob").replace(TESTS_DIR, tests_dir, 1)
+        for fp in results_files(logprob_dir):
+            for rec in iter_decisions(fp):
+                key = (prov, rec.neip, rec.cfp, rec.cost)
+                sums[key][rec.player - 1] += rec.action if rec.p_action is None else rec.p_action
+                counts[key][rec.player - 1] += 1
+    return {k: sums[k] / counts[k] for k in sums if counts[k].all()}
+
+
+def profile_probabilities(p):
+    """P(profile) for every row of PROFILES given per-player marginals p (shape (..., n))."""
+    p = np.asarray(p, dtype=float)[..., None, :]
+    return np.where(PROFILES == 1, p, 1 - p).prod(axis=-1)
+
+
+def equilibrium_probability(p, cost):
+    mask = GAME.equilibrium_mask(PROFILES, cost)
+    return float(profile_probabilities(p)[mask].sum())
+
+
+def main():
+    marginals = load_marginals()
+    if not marginals:
+        raise RuntimeError(f"No logprob estimates found in {TESTS_DIR!r}; run line_network.py with --estimation logprob")
+
+    results = defaultdict(lambda: defaultdict(dict))
+    print(f"{'provider':<10} {'neip':<13} {'cfp':<8} {'cost':>5} {'P(a_i=1)':<24} {'P(NE)':>6}")
+    for (prov, neip, cfp, cost), p in sorted(marginals.items()):
+        p_eq = equilibrium_probability(p, cost)
+        print(f"{prov:<10} {neip:<13} {cfp:<8} {cost:>5} {' '.join(f'{x:.2f}' for x in p):<24} {p_eq:>6.3f}")
+        if neip == "baseline":
+            results[cfp][prov][cost] = {"eq": p_eq, "total": 1}
+
+    if results:
+        providers = sorted({prov for cfp in results for prov in results[cfp]})
+        costs = sorted({c for cfp in results for prov in results[cfp] for c in results[cfp][prov]})
+        plot_heatmap(results, providers, costs, sorted(results), out_name="coordination_heatmap_logprob.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import os
+import csv
+import glob
+import argparse
+from array import array
+import numpy as np
+import scipy.sparse as sp
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from results_io import iter_decisions, results_files
+from games import GAMES, DEFAULT_GAME, TOPOLOGIES, make_game
+from heatmap_equilibria import MODEL_MAP
+
+# ------------------------------------------------------------
+# Regret and best-response diagnostics over all observed play.
+#
+# For every cell (provider, NEIP, CFP, cost) the repetitions with a complete
+# profile form the empirical distribution of play.  Player i's expected
+# payoff for each action is its mean payoff against the neighbours'
+# actions in those repetitions (u_i depends on them only through
+# k = A @ a, so this is one sparse product for all profiles at once).
+# Each decision is then scored against the better action:
+#     regret = max(E[u_i(0)], E[u_i(1)]) - E[u_i(a_i)].
+#
+# Decisions are loaded once into flat arrays and everything after that is
+# vectorized over records, so millions of decisions take seconds.
+# ------------------------------------------------------------
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TESTS_DIR = os.path.join(ROOT_DIR, "tests")
+TIE = -1
+
+
+class Decisions:
+    """Every decision as flat arrays; cells and repetitions are integer ids into `cells` and profiles."""
+
+    def __init__(self):
+        self.cells = []       # cell id -> (provider, neip, cfp, cost)
+        self._cell_ids = {}
+        self._profile_ids = {}
+        self.cell = array("l")
+        self.profile = array("l")
+        self.player = array("l")
+        self.action = array("b")
+
+    def add_file(self, provider, path):
+        cell_ids, profile_ids = self._cell_ids, self._profile_ids
+        for rec in iter_decisions(path):
+            key = (provider, rec.neip, rec.cfp, rec.cost)
+            c = cell_ids.get(key)
+            if c is None:
+                c = cell_ids[key] = len(self.cells)
+                self.cells.append(key)
+            rep = (c, path, rec.experiment_id)
+            p = profile_ids.get(rep)
+            if p is None:
+                p = profile_ids[rep] = len(profile_ids)
+            self.cell.append(c)
+            self.profile.append(p)
+            self.player.append(rec.player)
+            self.action.append(rec.action)
+
+    def arrays(self):
+        """(cell, profile, player, action) as numpy views of the collected arrays."""
+        return tuple(np.frombuffer(a, dtype=a.typecode) for a in (self.cell, self.profile, self.player, self.action))
+
+
+def load(game, topology, tests_dir=TESTS_DIR):
+    """Decisions of every provider for the given game and topology under tests_dir."""
+    from line_network import results_dir  # deferred: line_network loads the provider clients
+
+    decisions = Decisions()
+    for prov_dir in sorted(glob.glob(os.path.join(tests_dir, "*"))):
+        prov = os.path.basename(prov_dir)
+        if not os.path.isdir(prov_dir) or prov == "mixed":
+            continue
+        game_dir = results_dir(prov, game, topology).replace(TESTS_DIR, tests_dir, 1)
+        for path in results_files(game_dir):
+            decisions.add_file(prov, path)
+    return decisions
+
+
+def regrets(game, cell_cost, cell, profile, player, action):
+    """
+    Vectorized regret engine.
+
+    cell_cost: cost of every cell; cell, profile, player (1-based), action:
+    one entry per decision.  Returns (expected payoff of the chosen action,
+    best response (1, 0 or TIE), regret); NaN where the cell has no
+    complete profile to build the empirical distribution from.
+    """
+    n_cells, n_profiles = len(cell_cost), int(profile.max()) + 1 if len(profile) else 0
+    known = (player >= 1) & (player <= game.n)  # ignore answers naming a player outside the network
+    idx = np.where(known, player - 1, 0)
+
+    # profiles (rows) assembled from decisions; -1 where a player's answer is missing
+    profiles = np.full((n_profiles, game.n), -1, dtype=np.int8)
+    profiles[profile[known], idx[known]] = action[known]
+    profile_cell = np.zeros(n_profiles, dtype=np.int64)
+    profile_cell[profile] = cell
+    complete = (profiles >= 0).all(axis=1)
+    profiles, profile_cell = profiles[complete], profile_cell[complete]
+
+    # payoff of each action for every player in every complete profile
+    k = game.neighbour_counts(profiles)
+    u0, u1 = game.action_payoffs(k, cell_cost[profile_cell][:, None])
+    u0 = np.broadcast_to(u0, k.shape)
+    u1 = np.broadcast_to(u1, k.shape)
+
+    # mean over the profiles of each cell: expected payoffs, shape (n_cells, n)
+    members = sp.csr_matrix((np.ones(len(profile_cell)), (profile_cell, np.arange(len(profile_cell)))),
+                            shape=(n_cells, len(profile_cell)))
+    counts = np.asarray(members.sum(axis=1)).ravel()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        eu0 = (members @ u0) / counts[:, None]
+        eu1 = (members @ u1) / counts[:, None]
+
+    e0 = np.where(known, eu0[cell, idx], np.nan)
+    e1 = np.where(known, eu1[cell, idx], np.nan)
+    chosen = np.where(action == 1, e1, e0)
+    best_response = np.where(np.isclose(e0, e1), TIE, (e1 > e0).astype(int))
+    return chosen, best_response, np.maximum(e0, e1) - chosen
+
+
+def summarize(groups, regret, best_response, action):
+    """Per-group regret statistics; groups is an integer id per decision."""
+    valid = ~np.isnan(regret)
+    order = np.argsort(groups[valid], kind="stable")
+    groups, regret = groups[valid][order], regret[valid][order]
+    strict = (best_response[valid] == action[valid])[order]
+    ids, starts = np.unique(groups, return_index=True)
+    rows = []
+    for g, lo, hi in zip(ids, starts, list(starts[1:]) + [len(groups)]):
+        r = regret[lo:hi]
+        rows.append({
+            "group": int(g),
+            "decisions": int(hi - lo),
+            "mean_regret": float(r.mean()),
+            "median_regret": float(np.median(r)),
+            "p90_regret": float(np.quantile(r, 0.9)),
+            "max_regret": float(r.max()),
+            "best_response_rate": float(np.mean(r <= 1e-12)),          # no better action (ties included)
+            "strict_best_response_rate": float(strict[lo:hi].mean()),  # chose the strictly better action
+        })
+    return rows
+
+
+def plot_distributions(regret_by_provider, out_path):
+    providers = sorted(regret_by_provider)
+    fig, ax = plt.subplots(figsize=(1.6 * len(providers) + 2, 4))
+    data = [regret_by_provider[p] for p in providers]
+    ax.violinplot(data, showmeans=True, showextrema=True)
+    ax.set_xticks(range(1, len(providers) + 1))
+    ax.set_xticklabels([MODEL_MAP.get(p, p.capitalize()) for p in providers])
+    ax.set_ylabel("Regret vs. empirical play")
+    ax.set_title("Per-decision regret")
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=300)
+    plt.close(fig)
+    print(f"Saved regret distributions: {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expected payoffs, best responses and regret of every decision.")
+    parser.add_argument("--game", choices=sorted(GAMES), default=DEFAULT_GAME)
+    parser.add_argument("--topology", choices=sorted(TOPOLOGIES), default="line")
+    parser.add_argument("--out", type=str, default=os.path.join(TESTS_DIR, "regret_summary.csv"),
+                        help="Per (provider, NEIP, CFP, cost) summary")
+    args = parser.parse_args()
+
+    game = make_game(args.game, args.topology)
+    decisions = load(args.game, args.topology)
+    if not decisions.cells:
+        raise RuntimeError(f"No {args.game} results on a {args.topology} found in {TESTS_DIR!r}")
+    cell, profile, player, action = decisions.arrays()
+    cell_cost = np.array([cost for _, _, _, cost in decisions.cells], dtype=float)
+    _, best_response, regret = regrets(game, cell_cost, cell, profile, player, action)
+
+    # per cell
+    with open(args.out, "w", newline="") as f:
+        writer = None
+        for row in summarize(cell, regret, best_response, action):
+            prov, neip, cfp, cost = decisions.cells[row.pop("group")]
+            row = {"provider": prov, "neip": neip, "cfp": cfp, "cost": cost, **row}
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+    print(f"Saved regret summary: {args.out}")
+
+    # per provider
+    providers = sorted({c[0] for c in decisions.cells})
+    cell_provider = np.array([providers.index(c[0]) for c in decisions.cells])
+    print(f"{'provider':<10} {'decisions':>10} {'mean':>7} {'median':>7} {'p90':>7} {'max':>7} {'BR rate':>8}")
+    for row in summarize(cell_provider[cell], regret, best_response, action):
+        print(f"{providers[row['group']]:<10} {row['decisions']:>10} {row['mean_regret']:>7.3f} "
+              f"{row['median_regret']:>7.3f} {row['p90_regret']:>7.3f} {row['max_regret']:>7.3f} "
+              f"{row['best_response_rate']:>8.1%}")
+    by_provider = {p: regret[(cell_provider[cell] == i) & ~np.isnan(regret)] for i, p in enumerate(providers)}
+    plot_distributions({p: r for p, r in by_provider.items() if len(r)},
+                       os.path.join(os.path.dirname(args.out), "regret_distribution.png"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import os
+import re
+import glob
+import json
+import mmap
+import codecs
+from collections import Counter, namedtuple
+
+# ---------------------------------------------------------------------
+# Streaming reader for results files.
+#
+# Results files are either the legacy indented JSON array written by
+# line_network.py or JSON lines (one entry per line).  Entries are decoded
+# one at a time from a memory-mapped view of the file, so memory stays
+# bounded by a single entry (plus one read window) whatever the file size.
+# Compressed archives (archive.py, *.arc) are read through their index.
+# ---------------------------------------------------------------------
+
+Decision = namedtuple(
+    "Decision",
+    ["provider", "neip", "cfp", "cost", "player", "action", "experiment_id", "p_action"],
+    defaults=[None],
+)
+
+CHUNK_SIZE = 1 << 16
+RELEASE_SIZE = 1 << 22
+_WS = b" \t\r\n"
+_DECODER = json.JSONDecoder()
+_ID_RE = re.compile(r"_(\d+)$")
+ARCHIVE_SUFFIX = ".arc"
+
+
+def experiment_id_from_path(path):
+    """Return the repetition number encoded in results_<neip>_<id>.json, or None."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    m = _ID_RE.search(stem)
+    return int(m.group(1)) if m else None
+
+
+def _open_view(f):
+    """Memory-map f when possible; empty files and pipes fall back to a plain read."""
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return f.read()
+
+
+def _release(buf, start, end):
+    """Drop already-consumed mapped pages so resident memory does not grow with the file."""
+    end -= end % mmap.PAGESIZE
+    if isinstance(buf, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED") and end - start >= RELEASE_SIZE:
+        buf.madvise(mmap.MADV_DONTNEED, start, end - start)
+        return end
+    return start
+
+
+def _skip(buf, pos, chars):
+    while pos < len(buf) and buf[pos:pos + 1] in chars:
+        pos += 1
+    return pos
+
+
+def _iter_array(buf, pos):
+    """Yield the elements of the JSON array starting at buf[pos] ('[')."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    size = len(buf)
+    pos += 1
+    text, offset = "", 0
+    released = 0
+    while True:
+        while offset < len(text) and text[offset] in " \t\r\n,":
+            offset += 1
+        if offset < len(text) and text[offset] == "]":
+            return
+        try:
+            if offset == len(text):
+                raise json.JSONDecodeError("need more data", text, offset)
+            obj, offset = _DECODER.raw_decode(text, offset)
+        except json.JSONDecodeError:
+            if pos >= size:
+                if text[offset:].strip():
+                    raise
+                # a truncated (e.g. half-written) file must not pass for a complete one
+                raise json.JSONDecodeError("Unterminated array: expected ']'", text, offset)
+            # keep only the undecoded tail and pull in the next window
+            text = text[offset:] + decoder.decode(buf[pos:pos + CHUNK_SIZE], final=pos + CHUNK_SIZE >= size)
+            offset = 0
+            pos += CHUNK_SIZE
+            released = _release(buf, released, pos - CHUNK_SIZE)
+            continue
+        yield obj
+
+
+def _iter_lines(buf):
+    """Yield one decoded entry per non-blank line."""
+    start, size = 0, len(buf)
+    released = 0
+    while start < size:
+        end = buf.find(b"\n", start)
+        if end == -1:
+            end = size
+        line = bytes(buf[start:end]).strip()
+        if line:
+            yield json.loads(line)
+        start = end + 1
+        released = _release(buf, released, start)
+
+
+def results_files(directory, pattern="results_*"):
+    """
+    Sorted results files matching pattern in directory, as JSON or as archives.
+    A JSON file next to an archive of the same name would split that repetition
+    into incomplete profiles, so it is an error (`archive.py pack` merges them).
+    """
+    files = sorted(glob.glob(os.path.join(directory, pattern + ".json"))
+                   + glob.glob(os.path.join(directory, pattern + ARCHIVE_SUFFIX)))
+    stems = Counter(os.path.splitext(f)[0] for f in files)
+    clashes = sorted(s for s, k in stems.items() if k > 1)
+    if clashes:
+        raise ValueError(f"Both .json and {ARCHIVE_SUFFIX} exist for {', '.join(clashes)}; "
+                         "run `python archive.py pack` to merge them")
+    return files
+
+
+def iter_entries(path):
+    """Yield raw result entries from a JSON array, JSONL file or archive, one at a time."""
+    import archive  # deferred: archive.py imports this module
+    with open(path, "rb") as f:
+        if f.read(len(archive.MAGIC)) == archive.MAGIC:
+            with archive.ArchiveReader(path) as reader:
+                yield from reader
+            return
+        buf = _open_view(f)
+        if isinstance(buf, mmap.mmap) and hasattr(mmap, "MADV_SEQUENTIAL"):
+            buf.madvise(mmap.MADV_SEQUENTIAL)
+        try:
+            pos = _skip(buf, 0, _WS)
+            if buf[pos:pos + 1] == b"[":
+                yield from _iter_array(buf, pos)
+            else:
+                yield from _iter_lines(buf)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def parse_decision(entry, experiment_id=None):
+    """
+    Turn one result entry into a Decision, or None if the response has no usable decision.
+    Player and cost are the ones the model was asked about ("requested_player",
+    "requested_cost") when the entry records them; older entries fall back to the values
+    echoed in the response.  Anonymous prompts are answered as "a_i = <d>".
+    """
+    resp = entry.get("llm_response", {})
+    decision = resp.get("decision", "")
+    if "=" not in decision:
+        return None
+    try:
+        cost = entry.get("requested_cost")
+        if cost is None:
+            cost = float(resp.get("cost", "c = 0").split("=")[1].strip())
+        pid_part, val_part = decision.split("=")
+        pid = entry.get("requested_player")
+        if pid is None:
+            pid = int(pid_part.split("_")[1].strip())
+        val = int(val_part.strip())
+    except (IndexError, ValueError):
+        return None
+    return Decision(
+        provider=entry.get("provider"),
+        neip=entry.get("neip"),
+        cfp=entry.get("cfp"),
+        cost=cost,
+        player=pid,
+        action=val,
+        experiment_id=entry.get("experiment_id", experiment_id),
+        p_action=resp.get("p_decision"),  # P(a_i = 1) when estimated from logprobs
+    )
+
+
+def iter_decisions(path):
+    """Yield the typed decision records of a results file, skipping unparsable responses."""
+    default_id = experiment_id_from_path(path)
+    for entry in iter_entries(path):
+        rec = parse_decision(entry, default_id)
+        if rec is not None:
+            yield rec
+
+
+def iter_profiles(decisions, n_players=None):
+    """
+    Group a decision stream into action profiles.
+
+    Yields (experiment_id, neip, cfp, cost, profile) once per repetition and
+    scenario.  Only one repetition is buffered at a time, so consolidated
+    files holding many repetitions are still read with bounded memory.  If
+    n_players is given, incomplete profiles are dropped.
+    """
+    current_id = object()
+    scenarios = {}
+
+    def flush():
+        for (neip, cfp, cost), players in scenarios.items():
+            if n_players is not None and len(players) != n_players:
+                continue
+            profile = tuple(players[i] for i in sorted(players))
+            yield current_id, neip, cfp, cost, profile
+
+    for rec in decisions:
+        if rec.experiment_id != current_id:
+            yield from flush()
+            scenarios = {}
+            current_id = rec.experiment_id
+        scenarios.setdefault((rec.neip, rec.cfp, rec.cost), {})[rec.player] = rec.action
+    yield from flush()
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import prompts
+from results_io import iter_entries, parse_decision, experiment_id_from_path, ARCHIVE_SUFFIX
+from games import DEFAULT_GAME, make_game
+from line_network import TESTS_DIR, HISTORY_FILE, results_dir, run_experiment, orbit_representatives
+
+# ------------------------------------------------------------
+# Declarative sweeps: plan, estimate, then run from the same spec.
+#
+# A spec (TOML or YAML) lists providers, NEIPs, CFPs, costs, players and
+# repetitions.  `plan` expands it into cells, drops the cells already in
+# tests/<provider>/, and estimates tokens from the rendered prompts and
+# wall time / spend from the configured limits and the latency history
+# written by line_network.py.  `run` executes exactly the planned cells.
+#
+# Example (TOML):
+#     providers = ["mistral"]
+#     neips = ["baseline"]
+#     cfps = ["min", "safety", "peace"]
+#     costs = [0.5, 1, 2]
+#     players = [1, 2, 3, 4]
+#     experiment_ids = [11, 40]      # inclusive range
+#     game = "coordination"          # optional, see games.py
+#     topology = "line"              # optional
+#     symmetry = "off"               # optional: off | reuse | resample
+#
+#     [limits.mistral]
+#     concurrency = 4
+#     rpm = 120                      # requests per minute
+#     price_input = 0.4              # USD per 1M input tokens
+#     price_output = 2.0             # USD per 1M output tokens
+#     price_cached_input = 0.04      # USD per 1M cache-hit input tokens (default: price_input)
+# ------------------------------------------------------------
+DEFAULT_LIMITS = {
+    "concurrency": 1,
+    "rpm": 60,
+    "price_input": 0.0,
+    "price_output": 0.0,
+    "price_cached_input": None,  # None: cache hits are billed like other input
+    "latency_s": 2.0,       # used when there is no latency history
+    "output_tokens": 40,    # used when there is no output history
+}
+HISTORY_WINDOW = 500
+CHARS_PER_TOKEN = 4
+
+
+def load_spec(path):
+    if path.endswith((".yaml", ".yml")):
+        import yaml
+        with open(path) as f:
+            spec = yaml.safe_load(f)
+    else:
+        import tomllib
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    first, last = spec["experiment_ids"]
+    spec["experiment_ids"] = list(range(first, last + 1))
+    spec["costs"] = [float(c) for c in spec["costs"]]
+    spec.setdefault("neips", ["baseline"])
+    spec.setdefault("players", [1, 2, 3, 4])
+    spec.setdefault("estimation", "sampling")
+    spec.setdefault("game", DEFAULT_GAME)
+    spec.setdefault("topology", "line")
+    spec.setdefault("symmetry", "off")
+    spec.setdefault("limits", {})
+    return spec
+
+
+def limits_for(spec, provider):
+    return {**DEFAULT_LIMITS, **spec["limits"].get(provider, {})}
+
+
+def expand(spec):
+    """Every (provider, neip, experiment_id, player, cost, cfp) cell of the sweep."""
+    return [
+        (prov, neip, exp_id, player, cost, cfp)
+        for prov in spec["providers"]
+        for neip in spec["neips"]
+        for exp_id in spec["experiment_ids"]
+        for player in spec["players"]
+        for cost in spec["costs"]
+        for cfp in spec["cfps"]
+    ]
+
+
+def existing_cells(provider, prov_dir):
+    """
+    Cells of provider that already have a parsed decision in prov_dir, keyed on the
+    requested cost (see results_io.parse_decision), not the one the model echoed.
+    """
+    done = set()
+    if not os.path.isdir(prov_dir):
+        return done
+    for name in os.listdir(prov_dir):
+        if not (name.startswith("results_") and name.endswith((".json", ARCHIVE_SUFFIX))):
+            continue
+        path = os.path.join(prov_dir, name)
+        default_id = experiment_id_from_path(path)
+        for entry in iter_entries(path):
+            rec = parse_decision(entry, default_id)
+            if rec is not None:
+                done.add((provider, rec.neip, rec.experiment_id, rec.player, rec.cost, rec.cfp))
+    return done
+
+
+def _token_counter():
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(enc.encode(text))
+    except Exception:
+        return lambda text: len(text) // CHARS_PER_TOKEN + 1
+
+
+def load_history(provider, tests_dir=TESTS_DIR, window=HISTORY_WINDOW):
+    """Last `window` calls of provider (all of them for window=None)."""
+    path = os.path.join(tests_dir, provider, HISTORY_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        lines = f.readlines()
+    if window is not None:
+        lines = lines[-window:]
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def cache_stats(history):
+    """Prompt-cache hit rates and latency saved over the calls of history that report usage."""
+    calls = [h for h in history if "input_tokens" in h]
+    hits = [h for h in calls if h["cached_tokens"] > 0]
+    misses = [h for h in calls if h["cached_tokens"] == 0]
+    input_tokens = sum(h["input_tokens"] for h in calls)
+    cached_tokens = sum(h["cached_tokens"] for h in calls)
+    stats = {
+        "calls": len(history),
+        "with_usage": len(calls),
+        "hit_rate": len(hits) / len(calls) if calls else None,
+        "input_tokens": input_tokens,
+        "cached_tokens": cached_tokens,
+        "token_hit_rate": cached_tokens / input_tokens if input_tokens else None,
+        "latency_hit_s": None,
+        "latency_miss_s": None,
+        "latency_saved_s": None,
+    }
+    if hits and misses:
+        # mean latency of a miss minus that of a hit, for every hit
+        stats["latency_hit_s"] = sum(h["latency_s"] for h in hits) / len(hits)
+        stats["latency_miss_s"] = sum(h["latency_s"] for h in misses) / len(misses)
+        stats["latency_saved_s"] = (stats["latency_miss_s"] - stats["latency_hit_s"]) * len(hits)
+    return stats
+
+
+def print_cache_report(stats_by_provider):
+    def fmt(value, spec):
+        return "n/a" if value is None else format(value, spec)
+
+    print(f"{'provider':<10} {'calls':>7} {'usage':>7} {'hit rate':>9} {'cached tok':>11} {'tok hit':>8} "
+          f"{'hit s':>7} {'miss s':>7} {'saved s':>8}")
+    for prov, st in stats_by_provider.items():
+        print(f"{prov:<10} {st['calls']:>7} {st['with_usage']:>7} {fmt(st['hit_rate'], '.1%'):>9} "
+              f"{st['cached_tokens']:>11} {fmt(st['token_hit_rate'], '.1%'):>8} "
+              f"{fmt(st['latency_hit_s'], '.3f'):>7} {fmt(st['latency_miss_s'], '.3f'):>7} "
+              f"{fmt(st['latency_saved_s'], '.1f'):>8}")
+
+
+def plan(spec, tests_dir=TESTS_DIR):
+    """Return (pending cells, per-provider estimates)."""
+    cells = expand(spec)
+    done = set()
+    for prov in spec["providers"]:
+        prov_dir = results_dir(prov, spec["game"], spec["topology"], spec["symmetry"], spec["estimation"])
+        prov_dir = prov_dir.replace(TESTS_DIR, tests_dir, 1)
+        done |= existing_cells(prov, prov_dir)
+    pending = [c for c in cells if c not in done]
+
+    game = make_game(spec["game"], spec["topology"])
+    if spec["symmetry"] == "off":
+        queried_players = set(spec["players"])
+    else:
+        rep_of = orbit_representatives(game, set(spec["players"]))
+        queried_players = {p for p in spec["players"] if rep_of[p] == p}
+    count_tokens = _token_counter()
+    prompt_tokens = {}
+    estimates = {}
+    for prov in spec["providers"]:
+        limits = limits_for(spec, prov)
+        history = load_history(prov, tests_dir)
+        latency = sum(h["latency_s"] for h in history) / len(history) if history else limits["latency_s"]
+        if history:
+            output_tokens = sum(h["output_chars"] for h in history) / len(history) / CHARS_PER_TOKEN
+        else:
+            output_tokens = limits["output_tokens"]
+        # share of input tokens served from the prompt cache in past calls
+        cached_share = cache_stats(history)["token_hit_rate"] or 0.0
+        price_cached = limits["price_cached_input"]
+        if price_cached is None:
+            price_cached = limits["price_input"]
+        price_input = (1 - cached_share) * limits["price_input"] + cached_share * price_cached
+
+        calls = [c for c in pending if c[0] == prov and c[3] in queried_players]
+        input_tokens = 0
+        for _, neip, _, player, cost, cfp in calls:
+            key = (neip, player, cost, cfp)
+            if key not in prompt_tokens:
+                anonymous = spec["symmetry"] != "off"  # representatives get the label-free prompts
+                user = prompts.get_user_prompt(player, cost, cfp=cfp, game=game, anonymous=anonymous)
+                user = user.format(player_id=player, cost=cost)
+                system = prompts.get_system_prompt(neip, game=game, anonymous=anonymous)
+                prompt_tokens[key] = count_tokens(system) + count_tokens(user)
+            input_tokens += prompt_tokens[key]
+        total_output = output_tokens * len(calls)
+
+        # throughput is bounded both by the rate limit and by latency / concurrency
+        wall_s = max(len(calls) * latency / limits["concurrency"], len(calls) * 60.0 / limits["rpm"])
+        estimates[prov] = {
+            "cells": sum(1 for c in cells if c[0] == prov),
+            "calls": len(calls),
+            "input_tokens": input_tokens,
+            "output_tokens": round(total_output),
+            "wall_s": wall_s,
+            "cost_usd": (input_tokens * price_input + total_output * limits["price_output"]) / 1e6,
+            "latency_source": "history" if history else "spec",
+        }
+    return pending, estimates
+
+
+def print_plan(estimates):
+    print(f"{'provider':<10} {'cells':>7} {'calls':>7} {'in tok':>10} {'out tok':>9} {'hours':>7} {'USD':>8}  latency")
+    for prov, e in estimates.items():
+        print(f"{prov:<10} {e['cells']:>7} {e['calls']:>7} {e['input_tokens']:>10} {e['output_tokens']:>9} "
+              f"{e['wall_s'] / 3600:>7.2f} {e['cost_usd']:>8.2f}  {e['latency_source']}")
+    total_h = max((e["wall_s"] for e in estimates.values()), default=0.0) / 3600  # providers run in parallel
+    total_usd = sum(e["cost_usd"] for e in estimates.values())
+    print(f"{'total':<10} {'':>7} {sum(e['calls'] for e in estimates.values()):>7} {'':>10} {'':>9} {total_h:>7.2f} {total_usd:>8.2f}")
+
+
+def execute(spec, pending):
+    """
+    Run the pending cells, one line_network repetition per (provider, neip,
+    experiment_id).  Providers run concurrently, each within its own limits.
+    """
+    groups = defaultdict(lambda: defaultdict(list))
+    for prov, neip, exp_id, player, cost, cfp in pending:
+        groups[prov][(neip, exp_id)].append((player, cost, cfp))
+
+    def run_provider(prov):
+        limits = limits_for(spec, prov)
+        for (neip, exp_id), tasks in groups[prov].items():
+            run_experiment(prov, neip, exp_id, tasks, concurrency=limits["concurrency"], rpm=limits["rpm"],
+                           estimation=spec["estimation"], append=True,
+                           game=spec["game"], topology=spec["topology"], symmetry=spec["symmetry"])
+
+    with ThreadPoolExecutor(max_workers=max(1, len(groups))) as runner:
+        for f in [runner.submit(run_provider, prov) for prov in groups]:
+            f.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan or run a sweep from a TOML/YAML spec.")
+    parser.add_argument("command", choices=["plan", "run", "report"])
+    parser.add_argument("spec", help="Sweep spec (.toml, .yaml or .yml)")
+    parser.add_argument("--yes", action="store_true", help="Run without asking for confirmation")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    if args.command == "report":
+        print_cache_report({prov: cache_stats(load_history(prov, window=None)) for prov in spec["providers"]})
+        return
+    pending, estimates = plan(spec)
+    print_plan(estimates)
+    if args.command == "plan":
+        return
+    if not pending:
+        print("Nothing to run: every cell is already in tests/.")
+        return
+    if not args.yes and input(f"Run {len(pending)} calls? [y/N] ").strip().lower() != "y":
+        sys.exit(1)
+    seen = {prov: len(load_history(prov, window=None)) for prov in spec["providers"]}
+    execute(spec, pending)
+    print_cache_report({prov: cache_stats(load_history(prov, window=None)[seen[prov]:]) for prov in spec["providers"]})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import os
+import glob
+import time
+import fnmatch
+import argparse
+from collections import defaultdict, Counter
+import matplotlib
+matplotlib.use("Agg")
+from results_io import iter_decisions, iter_profiles, ARCHIVE_SUFFIX
+import aggregator
+import compare_neip_min
+import heatmap_equilibria
+import lineplots_equilibria
+
+# ------------------------------------------------------------
+# Watch mode: keep the aggregates and figures live during a sweep.
+#
+# tests/<provider>/ is polled for new, updated or deleted result files.
+# Each file's contribution (a Counter of profiles per cell) is kept, so a
+# changed file only folds its difference into the running aggregates.
+# A figure is re-rendered only when one of the cells it draws changed.
+# ------------------------------------------------------------
+TESTS_DIR = heatmap_equilibria.TESTS_DIR
+N_PLAYERS = 4
+
+# file kind -> filename pattern (JSON or archive), as globbed by the analysis scripts
+KINDS = {
+    "baseline": "results_baseline*",
+    "neip": "results_neip*",
+}
+
+
+def file_kind(path):
+    name = os.path.basename(path)
+    if not name.endswith((".json", ARCHIVE_SUFFIX)):
+        return None
+    for kind, pattern in KINDS.items():
+        if fnmatch.fnmatch(name, pattern):
+            return kind
+    return None
+
+
+class LiveAggregates:
+    """Profile counts per (provider, kind, cfp, cost) cell, updated one file at a time."""
+
+    def __init__(self):
+        self.cells = defaultdict(Counter)
+        self.contributions = {}  # path -> Counter((provider, kind, cfp, cost, profile))
+
+    def _apply(self, path, new):
+        old = self.contributions.pop(path, Counter())
+        dirty = set()
+        for key in set(old) | set(new):
+            delta = new[key] - old[key]
+            if delta:
+                prov, kind, cfp, cost, profile = key
+                cell = self.cells[(prov, kind, cfp, cost)]
+                cell[profile] += delta
+                if cell[profile] <= 0:
+                    del cell[profile]
+                dirty.add((prov, kind, cfp, cost))
+        if new:
+            self.contributions[path] = new
+        return dirty
+
+    def update_file(self, path):
+        """Re-read path and fold the difference into the aggregates; return the dirty cells."""
+        prov = os.path.basename(os.path.dirname(path))
+        kind = file_kind(path)
+        new = Counter(
+            (prov, kind, cfp, cost, profile)
+            for _, _, cfp, cost, profile in iter_profiles(iter_decisions(path))
+        )
+        return self._apply(path, new)
+
+    def remove_file(self, path):
+        return self._apply(path, Counter())
+
+    # ------------------------------------------------------------
+    # Views in the shapes the plotting functions expect
+    # ------------------------------------------------------------
+    def dist_counts(self, prov):
+        counts_by_cfp = defaultdict(lambda: defaultdict(Counter))
+        for (p, kind, cfp, cost), counts in self.cells.items():
+            if p == prov and kind == "baseline" and counts:
+                counts_by_cfp[cfp][cost] = counts
+        return counts_by_cfp
+
+    def neip_counts(self, prov):
+        out = {"baseline": defaultdict(Counter), "neip": defaultdict(Counter)}
+        for (p, kind, cfp, cost), counts in self.cells.items():
+            if p == prov and cfp == "min":
+                for profile, n in counts.items():
+                    if len(profile) == N_PLAYERS:
+                        out[kind][cost][profile] += n
+        return out["baseline"], out["neip"]
+
+    def equilibrium_results(self, is_equilibrium, complete_only=False, hamming=None):
+        results = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {"eq": 0, "total": 0, "dist": 0.0})))
+        costs, cfps = set(), set()
+        for (prov, kind, cfp, cost), counts in self.cells.items():
+            if kind != "baseline":
+                continue
+            for profile, n in counts.items():
+                if complete_only and len(profile) != N_PLAYERS:
+                    continue
+                costs.add(cost)
+                cfps.add(cfp)
+                rec = results[cfp][prov][cost]
+                rec["total"] += n
+                if is_equilibrium(profile, cost):
+                    rec["eq"] += n
+                if hamming is not None:
+                    rec["dist"] += n * hamming(profile, cost)
+        return results, sorted(costs), sorted(cfps)
+
+
+def figures_for(dirty):
+    """Map dirty cells to the figures that draw them."""
+    figures = set()
+    for prov, kind, cfp, cost in dirty:
+        if kind == "baseline":
+            figures.update({("dist", prov), ("heatmap", None), ("lineplots", None)})
+        if cfp == "min":
+            figures.add(("compare", prov))
+    return figures
+
+
+def render(figure, prov, agg, providers):
+    if figure == "dist":
+        counts = agg.dist_counts(prov)
+        if counts:
+            aggregator.plot_provider(counts, os.path.join(TESTS_DIR, prov))
+    elif figure == "compare":
+        baseline, neip100 = agg.neip_counts(prov)
+        compare_neip_min.plot_counts(baseline, neip100, prov)
+    elif figure == "heatmap":
+        results, costs, cfps = agg.equilibrium_results(heatmap_equilibria.is_equilibrium)
+        if cfps:
+            heatmap_equilibria.plot_heatmap(results, providers, costs, cfps)
+    elif figure == "lineplots":
+        results, costs, cfps = agg.equilibrium_results(
+            lineplots_equilibria.is_equilibrium, complete_only=True,
+            hamming=lineplots_equilibria.hamming_distance,
+        )
+        if cfps:
+            lineplots_equilibria.plot_equilibrium_prob(results, costs, providers, cfps)
+            lineplots_equilibria.plot_hamming_distance(results, costs, providers, cfps)
+            lineplots_equilibria.plot_equilibrium_prob_per_cfp(results, costs, providers, cfps)
+            lineplots_equilibria.plot_grouped_bar(results, costs, providers, cfps)
+
+
+def scan(tests_dir):
+    """Return {path: (mtime_ns, size)} for every watched results file."""
+    out = {}
+    for prov_dir in glob.glob(os.path.join(tests_dir, "*")):
+        if not os.path.isdir(prov_dir):
+            continue
+        for entry in os.scandir(prov_dir):
+            if entry.is_file() and file_kind(entry.path):
+                st = entry.stat()
+                out[entry.path] = (st.st_mtime_ns, st.st_size)
+    return out
+
+
+def poll_once(agg, seen, tests_dir=TESTS_DIR):
+    """Fold every changed file into agg and re-render the affected figures; return them."""
+    current = scan(tests_dir)
+    dirty = set()
+    for path in set(seen) - set(current):
+        dirty |= agg.remove_file(path)
+        del seen[path]
+    for path, stamp in current.items():
+        if seen.get(path) == stamp:
+            continue
+        try:
+            dirty |= agg.update_file(path)
+        except ValueError:
+            # file is still being written; pick it up on the next poll
+            continue
+        seen[path] = stamp
+
+    figures = figures_for(dirty)
+    providers = sorted({prov for prov, kind, _, _ in agg.cells if kind == "baseline"})
+    for figure, prov in sorted(figures, key=str):
+        try:
+            render(figure, prov, agg, providers)
+        except Exception as e:  # keep watching if one figure cannot be drawn yet
+            print(f"Could not render {figure} {prov or ''}: {e}")
+    return figures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch tests/<provider>/ and keep aggregates and figures up to date.")
+    parser.add_argument("--interval", type=float, default=5.0, help="Polling interval in seconds")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+
+    agg, seen = LiveAggregates(), {}
+    while True:
+        t0 = time.perf_counter()
+        figures = poll_once(agg, seen)
+        if figures:
+            print(f"Refreshed {len(figures)} figure(s) from {len(seen)} file(s) in {time.perf_counter() - t0:.1f}s")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()